@@ -119,24 +119,32 @@ class SilentCache(apt.Cache):
             os.close(_saved)
 apt.Cache = SilentCache
 
+import bisect
+import gzip
 import json
+import mmap
+import queue
+import tempfile
+import shutil
 import re
 import threading
 import subprocess
+import time
 import platform
 import urllib.request
 import urllib.error
 from pathlib import Path
+from collections import OrderedDict
 from functools import cmp_to_key
 from datetime import datetime
 
-from PyQt6.QtCore import Qt, QTimer, QObject, pyqtSignal
-from PyQt6.QtGui import QTextCursor, QCursor, QPalette, QColor
+from PyQt6.QtCore import Qt, QTimer, QObject, QEvent, pyqtSignal
+from PyQt6.QtGui import QTextCursor, QCursor, QPalette, QColor, QFont
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QPushButton, QCheckBox, QLineEdit, QComboBox, QTabWidget, QScrollArea,
-    QFrame, QTextEdit, QProgressBar, QMessageBox, QToolButton, QSizePolicy,
-    QStackedLayout,
+    QFrame, QPlainTextEdit, QProgressBar, QMessageBox, QToolButton, QSizePolicy,
+    QStackedLayout, QDialog, QListWidget, QListWidgetItem, QSplitter,
 )
 
 APP_ID = "com.xanmod.kernel.manager"
@@ -192,6 +200,37 @@ def gpu_relevant(pkg_name: str) -> bool:
         return False
     return True
 
+# Precompiled NVIDIA modules: linux-modules-nvidia-<branch>-<kver>-<flavor>,
+# where <branch> is the driver series plus an optional -server / -open
+# variant (550, 550-server, 570-open, 570-server-open)
+_NVIDIA_MODULES_RE = re.compile(
+    r"^linux-modules-nvidia-(\d+(?:-server)?(?:-open)?)-\d+\.\d+\.\d+-\d+-"
+)
+
+def nvidia_module_branch(pkg_name: str):
+    """Driver branch of a precompiled NVIDIA module package, e.g. '550' for
+    linux-modules-nvidia-550-6.14.0-37-generic — None for anything else."""
+    m = _NVIDIA_MODULES_RE.match(pkg_name)
+    return m.group(1) if m else None
+
+def detect_nvidia_branch():
+    """
+    Driver branch of the loaded NVIDIA kernel module ('550', '570-open'),
+    read from /proc/driver/nvidia/version. Returns None when no NVIDIA
+    driver is loaded. The -server variant can't be told apart here — an
+    installed module package for the running kernel is the better source
+    and is preferred where there is one (see KernelManager._nvidia_branch_in_use).
+    """
+    try:
+        with open("/proc/driver/nvidia/version") as f:
+            line = f.readline()
+    except Exception:
+        return None
+    m = re.search(r"Kernel Module(?:\s+for\s+\S+)?\s+(\d+)\.\d+", line)
+    if not m:
+        return None
+    return m.group(1) + ("-open" if "Open Kernel Module" in line else "")
+
 # ─── Package Classification ───────────────────────────────────────────────────
 
 def is_liquorix_name(name: str) -> bool:
@@ -556,6 +595,46 @@ DEFAULT_CONFIG = {
     "auto_remove_after_install": False,
     "win_size": [1080, 680],
     "dark_mode": True,
+    # Most card-body items (package rows, category labels, flavor sections)
+    # kept alive at once; bodies collapsed longest ago are torn down past
+    # this and rebuilt on their next expand (see BodyCache)
+    "card_body_budget": 3000,
+    # Mainline tab: newest versions shown per flavor before "Show older"
+    # (installed versions are always shown)
+    "mainline_window": 6,
+    # Session logs: finished sessions are compressed ("gzip", "zstd" — needs
+    # the zstd binary, falls back to gzip — or "none"), and the oldest are
+    # deleted past any of the three limits below
+    "log_compression": "gzip",
+    "log_keep_sessions": 200,
+    "log_max_age_days": 180,
+    "log_max_total_mb": 100,
+    # Keep one authenticated xkm-helper running between operations instead
+    # of a pkexec prompt per operation; it exits after this many idle
+    # seconds or when XKM quits
+    "helper_session": False,
+    "helper_session_idle_secs": 300,
+    # How long an operation waits for another package manager (e.g.
+    # unattended-upgrades) to release the dpkg lock before giving up
+    "dpkg_lock_timeout_secs": 600,
+    # DKMS preflight test builds run at once; the CPUs are split between
+    # them as make -j (0 = a quarter of the CPUs). Rebuilds after an install
+    # always go one kernel at a time, with every CPU
+    "dkms_preflight_jobs": 0,
+    # Compile DKMS modules through ccache (needs the ccache package), with
+    # the cache capped at this size
+    "dkms_ccache": False,
+    "dkms_ccache_size": "5G",
+    # Before installing a kernel, test-build the registered DKMS modules
+    # against its headers and ask before going ahead if any fail. Off by
+    # default: it downloads the header packages and compiles every module
+    # once more, which adds minutes to each kernel install (NVIDIA alone
+    # is several minutes per kernel)
+    "dkms_preflight": False,
+    # With an NVIDIA driver in use, installing a mainline kernel offers to
+    # also install its precompiled linux-modules-nvidia package for that
+    # driver branch when the archive has one, so DKMS doesn't have to build it
+    "nvidia_auto_pair": True,
 }
 
 # ─── Shared Config (single source of truth) ──────────────────────────────────
@@ -585,12 +664,13 @@ class KernelRow:
     def __init__(self, is_selected=False, markup="", name="", version="",
                  size="", status="", is_installed=False, is_active=False,
                  is_held=False, category="", kver="", gpu_relevant=True,
-                 flavor=""):
+                 flavor="", flavor_label="", family="", size_bytes=0):
         self.is_selected = is_selected
         self.markup = markup
         self.name = name
         self.version = version
         self.size = size
+        self.size_bytes = size_bytes
         self.status = status
         self.is_installed = is_installed
         self.is_active = is_active
@@ -599,6 +679,560 @@ class KernelRow:
         self.kver = kver
         self.gpu_relevant = gpu_relevant
         self.flavor = flavor
+        # Mainline flavor label (extract_kernel_flavor), computed once in
+        # _collect_kernels rather than re-derived by regex on every rebuild.
+        self.flavor_label = flavor_label
+        # "xanmod" / "liquorix" / "meta" / "mainline"
+        self.family = family
+        # Position in the current inventory's FacetIndex — assigned when
+        # the index is built, -1 until then.
+        self.row_id = -1
+
+
+# ─── Inventory Facet Index ───────────────────────────────────────────────────
+# Every filter the UI offers (flavor combos, XanMod psABI level, install
+# status, held, category, GPU relevance) is a fixed property of a row for
+# the lifetime of one loaded inventory. Rather than re-running
+# extract_kernel_flavor()'s regex + substring chain over every row on every
+# rebuild, each (facet, value) pair is precomputed once into a bitset —
+# a plain Python int with bit N set for row_id N — so a combo-box change is
+# just a handful of big-int ANDs instead of a full Python pass over the
+# inventory.
+
+def _row_facets(row):
+    """(facet, value) pairs a row is indexed under. Status is multi-valued
+    on purpose: an active kernel is also "installed", so both
+    status:installed and status:active find it."""
+    yield "family", row.family
+    if row.flavor_label:
+        yield "flavor", row.flavor_label
+    if row.family == "xanmod":
+        yield "psabi", row.flavor
+    yield "status", "installed" if row.is_installed else "available"
+    if row.is_active:
+        yield "status", "active"
+    yield "held", "yes" if row.is_held else "no"
+    if row.category:
+        yield "category", row.category
+    yield "gpu", "relevant" if row.gpu_relevant else "hidden"
+    if row.kver:
+        yield "kver", row.kver
+    # Group-click targets: packages that aren't installed yet vs.
+    # installed-but-inactive ones (see SelectionModel.group).
+    if row.gpu_relevant and not row.is_active:
+        yield "target", "remove" if row.is_installed else "install"
+
+
+class FacetIndex:
+    """Bitset facet index over one loaded inventory of KernelRows.
+
+    Rows keep the order they were given in (the _collect_kernels sort
+    order), and rows_in() hands them back in that same order, so renderers
+    see exactly the sequence they'd have got from the old per-family lists.
+    """
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.all = (1 << len(self.rows)) - 1
+        ids = {}
+        for i, row in enumerate(self.rows):
+            row.row_id = i
+            for facet, value in _row_facets(row):
+                ids.setdefault(facet, {}).setdefault(value, []).append(i)
+        self._facets = {
+            facet: {value: _mask_of(id_list) for value, id_list in values.items()}
+            for facet, values in ids.items()
+        }
+        self._any_cache = {}
+
+    def mask(self, facet, value) -> int:
+        return self._facets.get(facet, {}).get(value, 0)
+
+    def mask_any(self, facet, values) -> int:
+        """Union of several values of one facet (e.g. every flavor label
+        the "Generic" filter accepts). Cached — the filter combos only ever
+        ask for a handful of distinct combinations per inventory."""
+        key = (facet, frozenset(values))
+        m = self._any_cache.get(key)
+        if m is None:
+            m = 0
+            for v in key[1]:
+                m |= self.mask(facet, v)
+            self._any_cache[key] = m
+        return m
+
+    def values(self, facet):
+        return self._facets.get(facet, {}).keys()
+
+    def rows_in(self, mask: int) -> list:
+        """Materialize a bitset back into its rows, in inventory order."""
+        rows = self.rows
+        out = []
+        while mask:
+            low = mask & -mask
+            out.append(rows[low.bit_length() - 1])
+            mask ^= low
+        return out
+
+    @staticmethod
+    def mask_of_rows(rows) -> int:
+        return _mask_of(r.row_id for r in rows)
+
+
+def _mask_of(ids) -> int:
+    m = 0
+    for i in ids:
+        m |= 1 << i
+    return m
+
+
+# ─── Selection Model ─────────────────────────────────────────────────────────
+# Button enablement and every group checkbox only ever need counts ("is any
+# selected row installed and not held?", "how many of this group's targets
+# are selected?"), so those counts are kept up to date as rows are toggled
+# instead of being recomputed from a scan of the whole inventory per click.
+
+def _selection_kinds(row):
+    """Counters a selected row contributes to (see _update_buttons)."""
+    if not row.is_installed:
+        yield "available"
+    else:
+        if not row.is_active:
+            yield "removable"
+        yield "held" if row.is_held else "holdable"
+    if row.is_active:
+        yield "active"
+
+
+class SelectionGroup:
+    """Running selected-count over one group's header-click targets."""
+    __slots__ = ("target", "size", "selected", "cards")
+
+    def __init__(self, target: int, selected: int):
+        self.target = target
+        self.size = target.bit_count()
+        self.selected = selected
+        self.cards = []  # GroupCards currently showing this group
+
+    def check_state(self):
+        if not self.selected:
+            return Qt.CheckState.Unchecked
+        if self.selected == self.size:
+            return Qt.CheckState.Checked
+        return Qt.CheckState.PartiallyChecked
+
+
+class SelectionModel:
+    """The current selection, as a bitset over one FacetIndex, plus running
+    counters kept in step with it.
+
+    All selection changes go through set(), which flips row.is_selected
+    and adjusts the global counters and every registered group containing
+    that row. The groups it touched are collected until take_dirty(), so a
+    caller changing many rows refreshes each affected checkbox once.
+    Groups are identified by their rows' bitset; a group's targets are what
+    one header click selects: the not-yet-installed packages if there are
+    any (so one click installs exactly what's missing and never re-touches
+    anything already installed), otherwise the installed/inactive ones, so
+    the same click is still useful for a one-shot removal.
+    """
+
+    def __init__(self, facets: FacetIndex):
+        self.facets = facets
+        self.mask = 0
+        self.counts = dict.fromkeys(("available", "removable", "holdable", "held", "active"), 0)
+        self._install = facets.mask("target", "install")
+        self._remove = facets.mask("target", "remove")
+        self._groups = {}      # rows mask -> SelectionGroup
+        self._row_groups = {}  # row id -> [SelectionGroup]
+        self._dirty = {}
+
+    def group(self, rows_mask: int) -> SelectionGroup:
+        g = self._groups.get(rows_mask)
+        if g is None:
+            target = rows_mask & self._install or rows_mask & self._remove
+            g = SelectionGroup(target, (target & self.mask).bit_count())
+            for row in self.facets.rows_in(target):
+                self._row_groups.setdefault(row.row_id, []).append(g)
+            self._groups[rows_mask] = g
+        return g
+
+    def set(self, row, selected: bool) -> bool:
+        """Select or deselect one row; returns whether anything changed."""
+        if row.is_selected == selected:
+            return False
+        row.is_selected = selected
+        self.mask ^= 1 << row.row_id
+        delta = 1 if selected else -1
+        for kind in _selection_kinds(row):
+            self.counts[kind] += delta
+        for g in self._row_groups.get(row.row_id, ()):
+            g.selected += delta
+            self._dirty[g] = None
+        return True
+
+    def take_dirty(self):
+        dirty = list(self._dirty)
+        self._dirty.clear()
+        return dirty
+
+    def rows(self, mask: int = -1) -> list:
+        """Selected rows (optionally within `mask`), in inventory order."""
+        return self.facets.rows_in(self.mask & mask)
+
+
+def window_mainline_versions(facets, versions, kver_flavors, flavor_mask, query_mask, window):
+    """
+    The Mainline tab's history window over `versions` (newest first).
+    A version with rows under both masks is listed if it's among the newest
+    `window` such versions of any flavor it has, or if anything in it is
+    installed; the rest are only counted, for the "Show older" card.
+    Returns ([(kver, kver_mask), ...], n_older), kver_mask being the
+    version's rows under the flavor filter (not the search).
+    """
+    installed = facets.mask("status", "installed")
+    shown, shown_per_flavor, older = [], {}, 0
+    for kver in versions:
+        kver_mask = facets.mask("kver", kver) & flavor_mask
+        matched = kver_mask & query_mask
+        if not matched:
+            continue
+        flavors = [f for f in kver_flavors.get(kver, ()) if facets.mask("flavor", f) & matched]
+        in_window = any(shown_per_flavor.get(f, 0) < window for f in flavors)
+        for f in flavors:
+            shown_per_flavor[f] = shown_per_flavor.get(f, 0) + 1
+        if not in_window and not kver_mask & installed:
+            older += 1
+            continue
+        shown.append((kver, kver_mask))
+    return shown, older
+
+
+# ─── Group Aggregates ────────────────────────────────────────────────────────
+# What a card shows about its group (status tag, package count, flavor
+# badges, GPU hint, tooltip targets/categories) is a fixed property of the
+# group for one inventory, so it's derived once per group from the facet
+# bitsets and only formatted by the card builders.
+
+class GroupStats:
+    """Aggregates over one group of rows (see GroupAggregates)."""
+    __slots__ = ("n", "n_installed", "n_active", "n_held", "n_gpu_hidden",
+                 "total_bytes", "flavors", "badges", "categories",
+                 "n_install", "n_remove")
+
+    @property
+    def any_active(self) -> bool:
+        return self.n_active > 0
+
+    @property
+    def any_installed(self) -> bool:
+        return self.n_installed > 0
+
+    @property
+    def all_installed(self) -> bool:
+        return self.n_installed == self.n
+
+
+class GroupAggregates:
+    """GroupStats per rows bitset for one FacetIndex, computed on first
+    request and cached for the lifetime of the inventory. Everything except
+    the size total comes from bit operations on facet masks; the only
+    per-row work (package category and size) is done once, up front."""
+
+    def __init__(self, facets: FacetIndex):
+        self.facets = facets
+        cats = {}
+        self._bytes = []
+        for row in facets.rows:
+            cats.setdefault(pkg_category(row.name), []).append(row.row_id)
+            self._bytes.append(row.size_bytes)
+        self._categories = {c: _mask_of(ids) for c, ids in cats.items()}
+        self._flavors = sorted(facets.values("flavor"), key=_flavor_sort_key)
+        self._stats = {}
+
+    def stats(self, mask: int) -> GroupStats:
+        st = self._stats.get(mask)
+        if st is None:
+            st = self._stats[mask] = self._compute(mask)
+        return st
+
+    def stats_of(self, rows) -> GroupStats:
+        return self.stats(FacetIndex.mask_of_rows(rows))
+
+    def _compute(self, mask):
+        f = self.facets
+        st = GroupStats()
+        st.n = mask.bit_count()
+        st.n_installed = (mask & f.mask("status", "installed")).bit_count()
+        st.n_active = (mask & f.mask("status", "active")).bit_count()
+        st.n_held = (mask & f.mask("held", "yes")).bit_count()
+        st.n_gpu_hidden = (mask & f.mask("gpu", "hidden")).bit_count()
+        st.total_bytes = 0
+        m = mask
+        while m:
+            low = m & -m
+            st.total_bytes += self._bytes[low.bit_length() - 1]
+            m ^= low
+        st.flavors = [lbl for lbl in self._flavors if mask & f.mask("flavor", lbl)]
+        # Strip the "(HWE 22.04)" / "(64k pages)" parenthetical for the
+        # badge line — it's still visible in the flavor sub-section itself,
+        # but at a glance "Generic, Generic, OEM" from two HWE variants
+        # reads worse than just "Generic, OEM".
+        st.badges = list(dict.fromkeys(re.sub(r"\s*\(.*?\)", "", lbl) for lbl in st.flavors))
+        st.categories = sorted(c for c, cm in self._categories.items() if mask & cm)
+        st.n_install = (mask & f.mask("target", "install")).bit_count()
+        st.n_remove = (mask & f.mask("target", "remove")).bit_count()
+        return st
+
+
+class NvidiaModuleMatrix:
+    """Which precompiled NVIDIA module branches the inventory offers for
+    each mainline kernel, keyed by (kver, flavor label) — the same unit a
+    flavor section installs. A kernel with the package for the driver
+    branch in use can be paired with it; one without it leaves DKMS to
+    build the driver after install."""
+
+    def __init__(self, rows):
+        self._modules = {}
+        for row in rows:
+            branch = nvidia_module_branch(row.name)
+            if branch and row.kver:
+                self._modules.setdefault((row.kver, row.flavor_label), {})[branch] = row
+
+    def branches(self, kver, flavor):
+        return sorted(self._modules.get((kver, flavor), ()),
+                      key=lambda b: (int(b.split("-")[0]), b))
+
+    def module_for(self, kver, flavor, branch):
+        """The linux-modules-nvidia row for branch on that kernel, or None."""
+        return self._modules.get((kver, flavor), {}).get(branch)
+
+    def installed_branch(self, kver, flavor):
+        for branch, row in self._modules.get((kver, flavor), {}).items():
+            if row.is_installed:
+                return branch
+        return None
+
+
+def _trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Trigram index over the lowercased names and kvers of one inventory.
+
+    A row matches a query if the query is a substring of its name or its
+    kver — the same rule the filter box has always used. Trigrams only
+    narrow down the candidates; every candidate is still confirmed with a
+    real substring test, so the index can never change what matches, only
+    how fast. Typing further characters (a query containing the previous
+    one) refines the previous result set instead of starting over, and
+    recent results are kept so backspacing is a dict lookup.
+    """
+
+    _RECENT_MAX = 64
+
+    def __init__(self, facets: FacetIndex):
+        self.all = facets.all
+        self._names = [r.name.lower() for r in facets.rows]
+        self._kvers = [r.kver.lower() for r in facets.rows]
+        ids = {}
+        for i, (name, kver) in enumerate(zip(self._names, self._kvers)):
+            for g in _trigrams(name) | _trigrams(kver):
+                ids.setdefault(g, []).append(i)
+        self._grams = {g: _mask_of(id_list) for g, id_list in ids.items()}
+        self._recent = {"": self.all}
+        self._last = ""
+
+    def search(self, query: str) -> int:
+        """Bitset of the rows matching `query` (all rows for an empty one)."""
+        q = (query or "").strip().lower()
+        hit = self._recent.get(q)
+        if hit is not None:
+            self._last = q
+            return hit
+
+        # Narrowing: anything matching "6.14.0-3" also matched "6.14.0-",
+        # so only the previous result needs re-checking.
+        candidates = self._recent[self._last] if self._last and self._last in q else self.all
+        for g in _trigrams(q):
+            candidates &= self._grams.get(g, 0)
+            if not candidates:
+                break
+
+        names, kvers = self._names, self._kvers
+        matched = []
+        while candidates:
+            low = candidates & -candidates
+            i = low.bit_length() - 1
+            if q in names[i] or q in kvers[i]:
+                matched.append(i)
+            candidates ^= low
+        result = _mask_of(matched)
+
+        if len(self._recent) >= self._RECENT_MAX:
+            self._recent = {"": self.all}
+        self._recent[q] = result
+        self._last = q
+        return result
+
+
+# ─── Structured filter queries ───────────────────────────────────────────────
+# The filter box also accepts field terms, ANDed together with any plain
+# search words:
+#
+#     flavor:lowlatency status:installed kver>=6.8 held:no
+#     family:xanmod psabi:v3 category:headers gpu:hidden
+#
+# A comma means "any of" (flavor:generic,oem). kver (alias: version) takes
+# :, =, !=, <, <=, >, >= and compares with Debian version semantics; for
+# rows without a mainline kver (XanMod, Liquorix, meta) the package
+# version is used. Every term resolves to a FacetIndex bitset, so a whole
+# query compiles down to one integer, cached per query string for the
+# lifetime of the inventory.
+
+_QUERY_TERM_RE = re.compile(r"^([a-z]+)(:|>=|<=|!=|=|>|<)(.+)$")
+
+_QUERY_VOCAB = {
+    "status": ("installed", "available", "active", "held"),
+    "held": ("yes", "no"),
+    "family": ("xanmod", "liquorix", "meta", "mainline"),
+    "gpu": ("relevant", "hidden"),
+}
+_QUERY_ALIASES = {"true": "yes", "false": "no", "1": "yes", "0": "no", "y": "yes", "n": "no"}
+
+
+def _query_norm(text: str) -> str:
+    """"Low Latency" / "low-latency" / "lowlatency" all compare equal."""
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+class FilterQuery:
+    """Compiles filter-box text into a bitset over one inventory.
+
+    evaluate() raises ValueError for a malformed field term (unknown field,
+    unknown status/held/family/gpu value, a comparison on a non-version
+    field) so the caller can say what's wrong instead of silently showing
+    an empty list. evaluate_valid() is the filter box's version: it drops
+    just the malformed terms, keeps the rest, and returns what was wrong.
+    """
+
+    _CACHE_MAX = 256
+
+    def __init__(self, facets: FacetIndex, search: SearchIndex, version_cmp):
+        self._facets = facets
+        self._search = search
+        self._cmp = version_cmp
+        self._cache = {}
+        self._versions = None
+
+    def evaluate(self, text: str) -> int:
+        mask, errors = self.evaluate_valid(text)
+        if errors:
+            raise ValueError(errors[0])
+        return mask
+
+    def evaluate_valid(self, text: str):
+        """(mask of the well-formed terms, [error per malformed term])."""
+        key = " ".join((text or "").lower().split())
+        hit = self._cache.get(key)
+        if hit is not None:
+            return hit
+        mask = self._facets.all
+        errors = []
+        for term in key.split():
+            try:
+                mask &= self._term(term)
+            except ValueError as e:
+                errors.append(str(e))
+        if len(self._cache) >= self._CACHE_MAX:
+            self._cache.clear()
+        hit = self._cache[key] = (mask, errors)
+        return hit
+
+    def _term(self, term: str) -> int:
+        m = _QUERY_TERM_RE.match(term)
+        if not m:
+            return self._search.search(term)
+        field, op, value = m.groups()
+        if field in ("kver", "version"):
+            return self._version_term(op, value)
+        if op != ":":
+            raise ValueError(f"'{field}' only supports field:value, not {op}")
+        mask = 0
+        for v in filter(None, value.split(",")):
+            mask |= self._facet_term(field, v)
+        return mask
+
+    def _facet_term(self, field: str, value: str) -> int:
+        idx = self._facets
+        if field in ("flavor", "category"):
+            # Prefix match, like the Mainline flavor combo: "generic" also
+            # takes in "Generic (HWE 24.04)" and "Generic (64k pages)".
+            want = _query_norm(value)
+            mask = idx.mask_any(field, [v for v in idx.values(field) if _query_norm(v).startswith(want)])
+            if field == "flavor":
+                # XanMod flavors (v3, edge, lts, ...) answer to flavor: too.
+                mask |= idx.mask("psabi", want[3:] if want.startswith("x64") else want)
+            return mask
+        if field == "psabi":
+            value = _query_norm(value)
+            return idx.mask("psabi", value[3:] if value.startswith("x64") else value)
+        vocab = _QUERY_VOCAB.get(field)
+        if vocab is None:
+            raise ValueError(f"unknown filter field '{field}'")
+        value = _QUERY_ALIASES.get(value, value)
+        matches = [v for v in vocab if v.startswith(value)]
+        if not matches:
+            raise ValueError(f"{field}: expects one of {', '.join(vocab)}")
+        if field == "status" and "held" in matches:
+            matches.remove("held")
+            return idx.mask_any("status", matches) | (idx.mask("held", "yes") & idx.mask("status", "installed"))
+        return idx.mask_any(field, matches)
+
+    def _version_index(self):
+        """(sort keys, versions, prefix-OR bitsets) over every distinct row
+        version, oldest first — built on the first kver term, then reused."""
+        if self._versions is None:
+            by_ver = {}
+            for r in self._facets.rows:
+                v = r.kver or r.version
+                if v:
+                    by_ver.setdefault(v, []).append(r.row_id)
+            K = cmp_to_key(self._cmp)
+            vers = sorted(by_ver, key=K)
+            prefix = [0]
+            for v in vers:
+                prefix.append(prefix[-1] | _mask_of(by_ver[v]))
+            self._versions = ([K(v) for v in vers], vers, prefix)
+        return self._versions
+
+    def _version_term(self, op: str, value: str) -> int:
+        keys, vers, prefix = self._version_index()
+        every = prefix[-1]
+        if op == ":":
+            # kver:6.8 means the 6.8 series (6.8, 6.8.0-45, 6.8.12, ...),
+            # not a literal substring — "6.8" shouldn't pull in 6.18.
+            series = (value + ".", value + "-")
+            mask = 0
+            for i, v in enumerate(vers):
+                if v == value or v.startswith(series):
+                    mask |= prefix[i + 1] & ~prefix[i]
+            return mask
+        probe = cmp_to_key(self._cmp)(value)
+        lo = bisect.bisect_left(keys, probe)
+        hi = bisect.bisect_right(keys, probe)
+        if op == "<":
+            return prefix[lo]
+        if op == "<=":
+            return prefix[hi]
+        if op == ">":
+            return every & ~prefix[hi]
+        if op == ">=":
+            return every & ~prefix[lo]
+        equal = prefix[hi] & ~prefix[lo]
+        return equal if op == "=" else every & ~equal
+
 
 # ─── Mainline Meta / Tracking Packages ───────────────────────────────────────
 # "Meta" packages track a kernel flavour without pinning a specific build —
@@ -643,6 +1277,975 @@ class MainThreadDispatcher(QObject):
         self._sig.emit(fn, args, kwargs)
 
 
+# ─── dpkg lock ────────────────────────────────────────────────────────────────
+# The locks apt-get/dpkg take; any of them held means our run would fail.
+DPKG_LOCKS = (
+    "/var/lib/dpkg/lock-frontend",
+    "/var/lib/dpkg/lock",
+    "/var/cache/apt/archives/lock",
+    "/var/lib/apt/lists/lock",
+)
+
+
+def dpkg_lock_holder(locks=DPKG_LOCKS, proc_locks="/proc/locks"):
+    """The process holding one of `locks`, as {"pid", "name", "lock",
+    "running_secs"}, or None. Needs no privileges: the lock files are
+    matched by device and inode against the kernel's /proc/locks table,
+    and the holder's details come from /proc/<pid>."""
+    wanted = {}
+    for path in locks:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        wanted[(os.major(st.st_dev), os.minor(st.st_dev), st.st_ino)] = path
+    if not wanted:
+        return None
+    try:
+        with open(proc_locks, encoding="ascii") as f:
+            table = f.read().splitlines()
+    except OSError:
+        return None
+    for line in table:
+        # "1: POSIX  ADVISORY  WRITE 1234 08:02:131 0 EOF"; waiters are
+        # listed as "1: -> POSIX …" and skipped.
+        fields = line.split()
+        if len(fields) < 6 or fields[1] == "->":
+            continue
+        try:
+            pid = int(fields[4])
+            major, minor, ino = fields[5].split(":")
+            key = (int(major, 16), int(minor, 16), int(ino))
+        except ValueError:
+            continue
+        if key in wanted and pid > 0:
+            return {"pid": pid, "name": _proc_name(pid), "lock": wanted[key],
+                    "running_secs": _proc_running_secs(pid)}
+    return None
+
+
+def _proc_name(pid: int) -> str:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            argv = [a.decode("utf-8", "replace") for a in f.read().split(b"\0") if a]
+        # Python tools like unattended-upgrade run as "python3 /usr/bin/…"
+        if len(argv) > 1 and os.path.basename(argv[0]).startswith("python"):
+            return os.path.basename(argv[1])
+        if argv:
+            return os.path.basename(argv[0])
+    except OSError:
+        pass
+    try:
+        with open(f"/proc/{pid}/comm", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return f"pid {pid}"
+
+
+def _proc_running_secs(pid: int):
+    """Seconds since pid started, or None."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            # Field 22 (starttime, in clock ticks since boot) counting from
+            # after the parenthesised command name, which may hold spaces.
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", encoding="ascii") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+
+
+def _dkms_modules_registered(dkms_tree="/var/lib/dkms") -> bool:
+    """Whether any module is registered with DKMS (one directory per module
+    in its tree, next to plain files like dkms_dbversion)."""
+    try:
+        return any(e.is_dir() for e in os.scandir(dkms_tree))
+    except OSError:
+        return False
+
+
+# ─── Operation queue ──────────────────────────────────────────────────────────
+
+class QueuedJob:
+    """One package operation waiting for the helper: kind is "install",
+    "remove", "hold" or "unhold". `hold` lists the installed packages to
+    hold afterwards (Install + Hold); `session` names the log session."""
+
+    __slots__ = ("kind", "pkgs", "hold", "purge", "session")
+
+    def __init__(self, kind, pkgs, hold=(), purge=False, session=None):
+        self.kind = kind
+        self.pkgs = list(pkgs)
+        self.hold = list(hold)
+        self.purge = purge
+        self.session = session or kind
+
+    def merge(self, other: "QueuedJob") -> bool:
+        """Fold `other` into this job if one helper run can do both."""
+        if other.kind != self.kind or other.purge != self.purge:
+            return False
+        self.pkgs = list(dict.fromkeys(self.pkgs + other.pkgs))
+        self.hold = list(dict.fromkeys(self.hold + other.hold))
+        if other.session != self.session:
+            self.session = self.kind if self.kind != "remove" else ("purge" if self.purge else "remove")
+        return True
+
+    def label(self) -> str:
+        verb = {"install": "Install + Hold" if self.hold else "Install",
+                "remove": "Purge" if self.purge else "Remove",
+                "hold": "Hold", "unhold": "Unhold"}[self.kind]
+        return f"{verb} {len(self.pkgs)}"
+
+
+class OperationQueue:
+    """Jobs submitted while another operation runs, in order. A new job
+    merges into the last queued one when they are compatible (e.g. two
+    installs become one apt-get install, several holds one apt-mark)."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def add(self, job: QueuedJob) -> bool:
+        """Queue job; True if it was merged into the previous one."""
+        if self.jobs and self.jobs[-1].merge(job):
+            return True
+        self.jobs.append(job)
+        return False
+
+    def pop(self) -> QueuedJob:
+        return self.jobs.pop(0)
+
+    def clear(self):
+        self.jobs.clear()
+
+
+# ─── xkm-helper events ────────────────────────────────────────────────────────
+# What to tell the user for each apt error class xkm-helper reports.
+_APT_ERROR_HINTS = {
+    "not-found": "package not found — refresh the package lists (Check for Updates) "
+                 "and make sure its repository is enabled.",
+    "lock": "another package manager is running — wait for it to finish and try again.",
+    "dependencies": "dependency conflict — see the apt output above for the packages involved.",
+    "network": "a download failed — check the network connection and the mirror.",
+    "dpkg-interrupted": "an earlier dpkg run was interrupted — run "
+                        "'sudo dpkg --configure -a' and try again.",
+    "disk-full": "out of disk space — free up space in /boot or / and try again.",
+    "dpkg-failed": "a package failed to install or configure — see the dpkg error above.",
+}
+
+
+def parse_helper_event(line: str):
+    """The record on one line of xkm-helper's --events channel, or None for
+    anything else (e.g. pkexec's own messages on the same stream)."""
+    if not line.startswith("{"):
+        return None
+    try:
+        ev = json.loads(line)
+    except ValueError:
+        return None
+    return ev if isinstance(ev, dict) and "event" in ev else None
+
+
+class HelperSession:
+    """A long-lived "pkexec xkm-helper session" (one authentication) that
+    runs helper subcommands sent as request lines on its stdin.
+
+    request() blocks the calling worker thread until the helper reports the
+    request done: output lines go to on_line and events to on_event as they
+    arrive. If the helper had already exited (idle timeout, or it was never
+    started) a new one is started, which prompts again.
+
+    options() returns the helper's global options; they're read for every
+    request, and a session started with different ones is replaced, so a
+    changed setting applies from the next operation on — as it does for
+    one-off pkexec runs."""
+
+    DONE_MARK = "\x1exkm-request-done "
+
+    def __init__(self, helper_path: str, idle_secs: int, options=list):
+        self.helper_path = helper_path
+        self.idle_secs = idle_secs
+        self.options = options
+        self._started_options = None
+        self._proc = None
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._current = None
+
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _start(self, options):
+        self._started_options = options
+        self._proc = subprocess.Popen(
+            ["pkexec", self.helper_path] + options + ["session", str(self.idle_secs)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, bufsize=1,
+        )
+        threading.Thread(target=self._read_output, args=(self._proc,), daemon=True).start()
+        threading.Thread(target=self._read_events, args=(self._proc,), daemon=True).start()
+
+    def _read_output(self, proc):
+        for line in proc.stdout:
+            req = self._current
+            if line.startswith(self.DONE_MARK):
+                if req is not None and line.split()[1] == str(req["id"]):
+                    req["output_done"].set()
+            elif req is not None:
+                req["on_line"](line)
+        self._finish(proc)
+
+    def _read_events(self, proc):
+        for line in proc.stderr:
+            req = self._current
+            ev = parse_helper_event(line)
+            if ev is None:
+                # pkexec's own messages (e.g. a dismissed prompt)
+                if req is not None:
+                    req["on_line"](line)
+            elif ev["event"] == "request-done":
+                if req is not None and ev.get("id") == req["id"]:
+                    req["rc"] = ev.get("rc", 1)
+                    req["events_done"].set()
+            elif req is not None:
+                req["on_event"](ev)
+        self._finish(proc)
+
+    def _finish(self, proc):
+        # Both streams end when the helper exits; whatever request is still
+        # open fails with the helper's exit status.
+        rc = proc.wait()
+        req = self._current
+        if req is not None and self._proc is proc and not req["events_done"].is_set():
+            req["rc"] = rc or 1
+            req["lost"] = True
+            req["output_done"].set()
+            req["events_done"].set()
+
+    def request(self, args, on_line, on_event) -> int:
+        with self._lock:
+            options = list(self.options())
+            if self.alive() and options != self._started_options:
+                self.close()
+                self._proc.wait()
+            for attempt in range(2):
+                if not self.alive():
+                    self._start(options)
+                req = {
+                    "id": self._next_id, "on_line": on_line, "on_event": on_event, "rc": 1,
+                    "lost": False, "output_done": threading.Event(), "events_done": threading.Event(),
+                }
+                self._next_id += 1
+                self._current = req
+                try:
+                    self._proc.stdin.write(f"{req['id']} {' '.join(args)}\n")
+                    self._proc.stdin.flush()
+                except (BrokenPipeError, OSError, ValueError):
+                    req["lost"] = True
+                else:
+                    req["events_done"].wait()
+                    req["output_done"].wait()
+                self._current = None
+                # The helper timed out between requests: the request never
+                # ran, so start a fresh session once and send it again.
+                if not (req["lost"] and attempt == 0 and self._proc.wait() == 0):
+                    return req["rc"]
+            return req["rc"]
+
+    def close(self):
+        """Let the helper exit (it stops at EOF on stdin)."""
+        if self.alive():
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+
+
+# ─── apt progress records ─────────────────────────────────────────────────────
+# No status record or output line for this long while busy → the status bar
+# says so, rather than leaving a bar that looks like it is still moving.
+APT_STALL_SECS = 90
+
+
+class AptProgress:
+    """Turns the records apt-get writes to APT::Status-Fd into an overall
+    fraction, a phase name and an ETA.
+
+        dlstatus:<n>:<percent>:Retrieving file 3 of 11
+        pmstatus:<pkg>:<percent>:Unpacking linux-image-… (…)
+        pmerror:<deb>:<percent>:<message>
+
+    Download and dpkg each report 0–100 on their own; when there was a
+    download it takes the first DOWNLOAD_SHARE of the bar."""
+
+    DOWNLOAD_SHARE = 0.3
+    _RECORD_RE = re.compile(r"^(dlstatus|pmstatus|pmerror|pmconffile|media-change):(.*?):([\d.]+):(.*)$")
+    _PHASES = (
+        ("trigger", "triggers"),
+        ("Unpacking", "unpack"),
+        ("Preparing", "unpack"),
+        ("Configuring", "configure"),
+        ("Installed", "configure"),
+        ("Removing", "remove"),
+        ("Removed", "remove"),
+        ("Purging", "remove"),
+    )
+
+    def __init__(self, now=None):
+        self.started = time.monotonic() if now is None else now
+        self.downloaded = None   # download percent, None if nothing to fetch
+        self.installed = 0.0     # dpkg percent
+        self.phase = ""
+        self.package = ""
+        self.errors = []
+
+    def feed(self, line: str, now=None) -> bool:
+        """Apply one output line; False if it isn't a status record."""
+        m = self._RECORD_RE.match(line.rstrip("\n"))
+        if not m:
+            return False
+        kind, subject, pct, msg = m.groups()
+        pct = min(100.0, float(pct))
+        if kind == "dlstatus":
+            self.downloaded = pct
+            self.phase = "download"
+        elif kind == "pmstatus":
+            if self.downloaded is not None:
+                self.downloaded = 100.0
+            self.installed = max(self.installed, pct)
+            self.package = subject
+            self.phase = next((ph for key, ph in self._PHASES if key in msg), self.phase or "unpack")
+        elif kind == "pmerror":
+            self.errors.append(f"{subject}: {msg}")
+        return True
+
+    @property
+    def fraction(self) -> float:
+        if self.downloaded is None:
+            return self.installed / 100
+        share = self.DOWNLOAD_SHARE
+        return (share * self.downloaded + (1 - share) * self.installed) / 100
+
+    def eta(self, now=None):
+        """Seconds left at the average rate so far, or None while there is
+        too little to go on."""
+        elapsed = (time.monotonic() if now is None else now) - self.started
+        frac = self.fraction
+        if frac < 0.02 or elapsed < 3:
+            return None
+        return elapsed * (1 - frac) / frac
+
+    def describe(self, now=None) -> str:
+        parts = [f"{self.phase} {self.package}".strip() if self.phase else "", f"{self.fraction:.0%}"]
+        eta = self.eta(now)
+        if eta is not None and self.fraction < 1:
+            parts.append(f"~{_format_duration(eta)} left")
+        return " · ".join(p for p in parts if p)
+
+
+def _format_duration(secs: float) -> str:
+    secs = int(secs + 0.5)
+    if secs < 60:
+        return f"{secs} s"
+    if secs < 3600:
+        return f"{secs // 60} min {secs % 60:02d} s"
+    return f"{secs // 3600} h {secs % 3600 // 60:02d} min"
+
+
+# ─── Batched log sink ─────────────────────────────────────────────────────────
+# Lines shown in the Details view at most; older ones scroll off the top
+# (the session file keeps everything).
+LOG_VIEW_MAX_LINES = 10000
+
+
+class LogSink(QObject):
+    """Collects log text from any thread and hands it to the Details view
+    (and the current session file) in batches.
+
+    write() only appends to a locked buffer; the first write into an empty
+    buffer arms a LOG_FLUSH_MS timer on the GUI thread (one queued signal
+    per batch instead of one per line), and flush() then inserts the whole
+    batch with a single cursor operation. The view follows new output only
+    if it was already scrolled to the bottom, so reading back through a
+    long log isn't interrupted.
+    """
+
+    FLUSH_MS = 50
+    # Most lines one flush adds to the view — bounds the time a flush can
+    # take (inserting, and trimming past LOG_VIEW_MAX_LINES) however fast
+    # the output comes.
+    MAX_FLUSH_LINES = 1000
+    _kick = pyqtSignal()
+
+    def __init__(self, view: QPlainTextEdit):
+        super().__init__()
+        self.view = view
+        self.writer = None  # LogWriter for the session files, if any
+        self._lock = threading.Lock()
+        self._pending = []
+        self._armed = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.FLUSH_MS)
+        self._timer.timeout.connect(self.flush)
+        self._kick.connect(self._timer.start)  # queued when emitted off-thread
+
+    def write(self, text: str):
+        """Thread-safe."""
+        with self._lock:
+            self._pending.append(text)
+            if self._armed:
+                return
+            self._armed = True
+        self._kick.emit()
+
+    def flush(self):
+        """Write out everything pending now (GUI thread only)."""
+        with self._lock:
+            chunk = "".join(self._pending)
+            self._pending.clear()
+            self._armed = False
+        if not chunk:
+            return
+        if self.writer is not None:
+            self.writer.write(chunk)
+        lines = chunk.count("\n")
+        if lines > self.MAX_FLUSH_LINES:
+            # Output is arriving faster than anyone can read it; show the
+            # tail of this batch and say what was skipped.
+            cut = len(chunk)
+            for _ in range(self.MAX_FLUSH_LINES + 1):
+                cut = chunk.rfind("\n", 0, cut)
+            chunk = (f"… {chunk.count(chr(10), 0, cut + 1)} lines not shown here "
+                     f"(the session log has everything) …\n" + chunk[cut + 1:])
+        sb = self.view.verticalScrollBar()
+        at_bottom = sb.value() >= sb.maximum() - 2
+        cursor = QTextCursor(self.view.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(chunk)
+        if at_bottom:
+            sb.setValue(sb.maximum())
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+        self.view.clear()
+
+
+# ─── Session log files ───────────────────────────────────────────────────────
+
+LOG_SUFFIXES = (".log", ".log.gz", ".log.zst")
+
+
+def prune_logs(log_dir: Path, keep: int, max_age_days: float, max_total_bytes: int,
+               exclude=(), now=None) -> list:
+    """Delete session logs, oldest first, beyond `keep` files, older than
+    `max_age_days`, or past `max_total_bytes` in total. Files in `exclude`
+    (the session being written) are never touched. Returns what was
+    deleted."""
+    now = time.time() if now is None else now
+    logs = []
+    for p in log_dir.iterdir() if log_dir.is_dir() else ():
+        if p.name.endswith(LOG_SUFFIXES) and p not in exclude:
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            logs.append((st.st_mtime, st.st_size, p))
+    logs.sort(reverse=True)  # newest first
+    deleted = []
+    total = 0  # size of the logs kept so far
+    for i, (mtime, size, p) in enumerate(logs):
+        if i >= keep or now - mtime > max_age_days * 86400 or total + size > max_total_bytes:
+            try:
+                p.unlink()
+                deleted.append(p)
+            except OSError:
+                pass
+            continue
+        total += size
+    return deleted
+
+
+def _open_paths(proc="/proc") -> set:
+    """Paths of the files open in any process we can see (our own user's),
+    from the /proc/<pid>/fd links."""
+    held = set()
+    try:
+        pids = [d for d in os.listdir(proc) if d.isdigit()]
+    except OSError:
+        return held
+    for pid in pids:
+        fd_dir = os.path.join(proc, pid, "fd")
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                held.add(os.readlink(os.path.join(fd_dir, fd)))
+            except OSError:
+                pass
+    return held
+
+
+class LogWriter(threading.Thread):
+    """Owns the session log files, on a thread of its own.
+
+    write() only queues text; the thread writes it through a normal
+    buffered file, fsyncs at most every FSYNC_SECS while there's unsynced
+    data, and when a session is closed, compresses it and applies the
+    retention limits from the config. Leftover uncompressed logs from a
+    session that never closed (crash, power loss) are compressed at
+    startup — but only once they're stale and no process has them open,
+    so another running XKM's session log is left alone.
+    """
+
+    FSYNC_SECS = 2.0
+    # An uncompressed log touched more recently than this may still be
+    # another instance's session in progress.
+    STALE_SECS = FSYNC_SECS * 30
+
+    def __init__(self, log_dir: Path, cfg: dict):
+        super().__init__(daemon=True, name="xkm-log-writer")
+        self.log_dir = log_dir
+        self.compression = cfg.get("log_compression", "gzip")
+        if self.compression == "zstd" and not shutil.which("zstd"):
+            self.compression = "gzip"
+        self.keep = int(cfg.get("log_keep_sessions", 200))
+        self.max_age_days = float(cfg.get("log_max_age_days", 180))
+        self.max_total_bytes = int(float(cfg.get("log_max_total_mb", 100)) * 1024 * 1024)
+        self._q = queue.Queue()
+        self._file = None
+        self._path = None
+        self._dirty = False
+
+    # ── Called from any thread ──
+    def open(self, path: Path):
+        self._q.put(("open", path))
+
+    def write(self, text: str):
+        self._q.put(("write", text))
+
+    def close(self):
+        self._q.put(("close", None))
+
+    def stop(self, timeout=5.0):
+        """Close the current session (if any) and wait for the thread."""
+        self._q.put(("stop", None))
+        self.join(timeout)
+
+    # ── Writer thread ──
+    def run(self):
+        self._maintain()
+        while True:
+            try:
+                op, arg = self._q.get(timeout=self.FSYNC_SECS if self._dirty else None)
+            except queue.Empty:
+                self._sync()
+                continue
+            try:
+                if op == "write":
+                    if self._file is not None:
+                        self._file.write(arg)
+                        self._dirty = True
+                elif op == "open":
+                    self._close_session()
+                    self.log_dir.mkdir(parents=True, exist_ok=True)
+                    self._file = open(arg, "w", encoding="utf-8")
+                    self._path = arg
+                elif op == "close":
+                    self._close_session()
+                elif op == "stop":
+                    self._close_session()
+                    return
+            except OSError:
+                pass
+
+    def _sync(self):
+        if self._file is not None and self._dirty:
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError:
+                pass
+        self._dirty = False
+
+    def _close_session(self):
+        if self._file is None:
+            return
+        self._sync()
+        self._file.close()
+        path, self._file, self._path = self._path, None, None
+        self._compress(path)
+        self._maintain()
+        LogIndex(self.log_dir).refresh()
+
+    def _compress(self, path: Path):
+        try:
+            if self.compression == "zstd":
+                subprocess.run(["zstd", "-q", "--rm", "-f", str(path)],
+                               check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            elif self.compression == "gzip":
+                with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                # Keep the original mtime so retention still sees the
+                # session's real age.
+                st = path.stat()
+                os.utime(f"{path}.gz", (st.st_atime, st.st_mtime))
+                path.unlink()
+        except (OSError, subprocess.CalledProcessError):
+            pass
+
+    def _maintain(self):
+        if not self.log_dir.is_dir():
+            return
+        logs = [p for p in self.log_dir.glob("*.log") if p != self._path]
+        leftover = self._leftover_logs(logs)
+        if self.compression != "none":
+            for p in leftover:
+                self._compress(p)
+        exclude = [p for p in logs if p not in leftover]
+        if self._path:
+            exclude.append(self._path)
+        prune_logs(self.log_dir, self.keep, self.max_age_days, self.max_total_bytes, exclude)
+
+    def _leftover_logs(self, logs):
+        """The logs among `logs` that no session is writing any more."""
+        cutoff = time.time() - self.STALE_SECS
+        stale = []
+        for p in logs:
+            try:
+                if p.stat().st_mtime < cutoff:
+                    stale.append(p)
+            except OSError:
+                pass
+        if not stale:
+            return []
+        held = _open_paths()
+        return [p for p in stale if os.path.realpath(p) not in held]
+
+
+# ─── Session log index & browser ────────────────────────────────────────────
+
+_LOG_NAME_RE = re.compile(r"^(?P<op>.+)_(?P<ts>\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})\.log(?:\.gz|\.zst)?$")
+# Lines worth jumping to: apt/dpkg errors, our own error notes, DKMS
+# failures ("✗" from xkm-helper) and non-zero exits.
+_LOG_ERROR_RE = re.compile(
+    r"apt exited with code|✗|^\s*\[ERROR\]|^E: |^dpkg: error|^\[exit status [1-9]"
+)
+_LOG_EXIT_RE = re.compile(r"^\[exit status (-?\d+)\]")
+# "$ xkm-helper install pkg..." lines written by _stream_subprocess, and
+# apt's own per-package progress lines.
+_LOG_PKG_RE = re.compile(r"^(?:Unpacking|Setting up|Removing|Purging configuration files for) ([\w.+:-]+)")
+
+
+def _open_log_bytes(path: Path):
+    """Binary read stream of a session log, compressed or not."""
+    if path.name.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.name.endswith(".zst"):
+        proc = subprocess.Popen(["zstd", "-dcq", str(path)], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL)
+        return proc.stdout
+    return open(path, "rb")
+
+
+def scan_log(path: Path) -> dict:
+    """One pass over a session log: what ran, on which packages, how it
+    ended, and where the errors are (first 50, with line numbers)."""
+    m = _LOG_NAME_RE.match(path.name)
+    entry = {
+        "file": path.name,
+        "op": m.group("op") if m else path.name.split("_")[0],
+        "time": "",
+        "packages": [], "status": None, "errors": [], "n_errors": 0,
+    }
+    if m:
+        date, clock = m.group("ts").split("_")
+        entry["time"] = f"{date} {clock.replace('-', ':')}"
+    pkgs = {}
+    with _open_log_bytes(path) as f:
+        for n, raw in enumerate(f):
+            line = raw.decode("utf-8", "replace").rstrip("\n")
+            if line.startswith("$ "):
+                for tok in line.split()[3:]:
+                    if not tok.startswith("-"):
+                        pkgs[tok] = None
+                continue
+            pm = _LOG_PKG_RE.match(line)
+            if pm:
+                pkgs[pm.group(1).split(":")[0]] = None
+            em = _LOG_EXIT_RE.match(line)
+            if em:
+                rc = int(em.group(1))
+                entry["status"] = rc if rc or entry["status"] is None else entry["status"]
+            if _LOG_ERROR_RE.search(line):
+                entry["n_errors"] += 1
+                if len(entry["errors"]) < 50:
+                    entry["errors"].append([n, line.strip()[:200]])
+    entry["packages"] = list(pkgs)
+    return entry
+
+
+class LogIndex:
+    """On-disk summary of every session log (LOG_DIR/index.json), kept in
+    step with the directory: entries are reused while a file's size and
+    mtime are unchanged, new or changed files are scanned, deleted ones
+    dropped. search() then only looks at the summaries, so finding e.g.
+    every install with a DKMS failure across hundreds of (compressed)
+    logs never reopens a log file."""
+
+    # refresh() runs on the LogWriter thread when a session closes and on
+    # the log browser's worker; both rewrite index.json, so one at a time.
+    _refresh_lock = threading.Lock()
+
+    def __init__(self, log_dir: Path):
+        self.log_dir = log_dir
+        self.path = log_dir / "index.json"
+        self.entries = []
+
+    def refresh(self) -> "LogIndex":
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh(self) -> "LogIndex":
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                old = {e["file"]: e for e in json.load(f)}
+        except (OSError, ValueError, KeyError, TypeError):
+            old = {}
+        entries = []
+        changed = False
+        for p in self.log_dir.iterdir() if self.log_dir.is_dir() else ():
+            if not p.name.endswith(LOG_SUFFIXES):
+                continue
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            e = old.get(p.name)
+            if e is None or e.get("size") != st.st_size or e.get("mtime") != st.st_mtime:
+                try:
+                    e = scan_log(p)
+                except OSError:
+                    continue
+                e["size"], e["mtime"] = st.st_size, st.st_mtime
+                changed = True
+            entries.append(e)
+        entries.sort(key=lambda e: (e["time"], e["file"]), reverse=True)
+        if changed or len(entries) != len(old):
+            tmp = self.path.with_suffix(".tmp")
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(entries, f)
+                os.replace(tmp, self.path)
+            except OSError:
+                pass
+        for e in entries:
+            failed = bool(e["status"]) or e["n_errors"] > 0
+            e["_text"] = " ".join([
+                e["op"], e["time"], " ".join(e["packages"]),
+                " ".join(t for _, t in e["errors"]), "failed" if failed else "ok",
+            ]).lower()
+        self.entries = entries
+        return self
+
+    def search(self, query: str) -> list:
+        """Entries containing every whitespace-separated term of `query`
+        (case-insensitive) in their operation, date, packages, error lines
+        or "ok"/"failed" — newest first."""
+        terms = query.lower().split()
+        return [e for e in self.entries if all(t in e["_text"] for t in terms)]
+
+
+class LogFile:
+    """Random access to the lines of one session log without reading it
+    all into memory: the (decompressed) file is memory-mapped and a table
+    of line start offsets is built once, so any page of lines is a slice."""
+
+    def __init__(self, path: Path):
+        if path.name.endswith((".gz", ".zst")):
+            self._file = tempfile.TemporaryFile()
+            with _open_log_bytes(path) as src:
+                shutil.copyfileobj(src, self._file)
+            self._file.flush()
+        else:
+            self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        offsets = [0]
+        find = self._mm.find
+        pos = find(b"\n")
+        while pos != -1:
+            offsets.append(pos + 1)
+            pos = find(b"\n", pos + 1)
+        if offsets[-1] == size and len(offsets) > 1:
+            offsets.pop()  # no empty last line after a trailing newline
+        self._offsets = offsets
+        self._size = size
+
+    @property
+    def line_count(self) -> int:
+        return len(self._offsets) if self._size else 0
+
+    def lines(self, start: int, count: int) -> str:
+        end = start + count
+        a = self._offsets[start] if start < len(self._offsets) else self._size
+        b = self._offsets[end] if end < len(self._offsets) else self._size
+        return self._mm[a:b].decode("utf-8", "replace")
+
+    def close(self):
+        if self._size:
+            self._mm.close()
+        self._file.close()
+
+
+class LogBrowserDialog(QDialog):
+    """Past sessions, searchable through the LogIndex, and a paged view of
+    the selected log. Picking an error line jumps to its page."""
+
+    PAGE_LINES = 2000
+
+    def __init__(self, parent, log_dir: Path):
+        super().__init__(parent)
+        self.setWindowTitle("Log History")
+        self.resize(1000, 640)
+        self._index = LogIndex(log_dir)
+        self._log_dir = log_dir
+        self._file = None
+        self._page = 0
+        self._dispatch = MainThreadDispatcher()
+
+        lay = QVBoxLayout(self)
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Search past sessions — e.g. “install failed”, “dkms 2026-09”, a package name")
+        self.search.textChanged.connect(self._refilter)
+        lay.addWidget(self.search)
+
+        split = QSplitter()
+        left = QWidget()
+        left_lay = QVBoxLayout(left)
+        left_lay.setContentsMargins(0, 0, 0, 0)
+        self.sessions = QListWidget()
+        self.sessions.currentItemChanged.connect(self._on_session)
+        left_lay.addWidget(self.sessions, 3)
+        self.errors = QListWidget()
+        self.errors.itemActivated.connect(self._on_error)
+        self.errors.itemClicked.connect(self._on_error)
+        left_lay.addWidget(self.errors, 1)
+        split.addWidget(left)
+
+        right = QWidget()
+        right_lay = QVBoxLayout(right)
+        right_lay.setContentsMargins(0, 0, 0, 0)
+        self.view = QPlainTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setFont(QFont("monospace"))
+        right_lay.addWidget(self.view, 1)
+        nav = QHBoxLayout()
+        self.btn_prev = QPushButton("◀ Previous")
+        self.btn_prev.clicked.connect(lambda: self._show_page(self._page - 1))
+        self.btn_next = QPushButton("Next ▶")
+        self.btn_next.clicked.connect(lambda: self._show_page(self._page + 1))
+        self.page_lbl = QLabel()
+        self.page_lbl.setProperty("role", "muted")
+        nav.addWidget(self.btn_prev)
+        nav.addWidget(self.page_lbl, 1, Qt.AlignmentFlag.AlignHCenter)
+        nav.addWidget(self.btn_next)
+        right_lay.addLayout(nav)
+        split.addWidget(right)
+        split.setStretchFactor(1, 2)
+        lay.addWidget(split, 1)
+
+        self.status = QLabel("Indexing logs…")
+        self.status.setProperty("role", "muted")
+        lay.addWidget(self.status)
+        self._show_page(0)
+        self.reindex()
+
+    def reindex(self):
+        """Bring the index up to date in the background, then re-run the
+        search. The dialog is kept and reused, so this runs on every open."""
+        self.status.setText("Indexing logs…")
+
+        def worker():
+            self._index.refresh()
+            self._dispatch.call(self._refilter)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _refilter(self, *_):
+        t0 = time.perf_counter()
+        hits = self._index.search(self.search.text())
+        ms = (time.perf_counter() - t0) * 1000
+        self.sessions.clear()
+        for e in hits:
+            if e["status"] is None:
+                tag = ""
+            elif e["status"] or e["n_errors"]:
+                tag = f"  ✗ {e['n_errors']} error line(s)" + (f", exit {e['status']}" if e["status"] else "")
+            else:
+                tag = "  ✓"
+            pkgs = ", ".join(e["packages"][:3]) + (" …" if len(e["packages"]) > 3 else "")
+            item = QListWidgetItem(f"{e['time']}  {e['op']}{tag}\n    {pkgs or '—'}")
+            item.setData(Qt.ItemDataRole.UserRole, e)
+            self.sessions.addItem(item)
+        self.status.setText(
+            f"{len(hits)} of {len(self._index.entries)} session(s) — searched in {ms:.1f} ms"
+        )
+
+    def _on_session(self, item, _prev=None):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.errors.clear()
+        if item is None:
+            self._show_page(0)
+            return
+        e = item.data(Qt.ItemDataRole.UserRole)
+        try:
+            self._file = LogFile(self._log_dir / e["file"])
+        except (OSError, ValueError):
+            self.view.setPlainText(f"Couldn't open {e['file']}.")
+            return
+        for line_no, text in e["errors"]:
+            err = QListWidgetItem(f"{line_no + 1}: {text}")
+            err.setData(Qt.ItemDataRole.UserRole, line_no)
+            self.errors.addItem(err)
+        self._show_page(0)
+
+    def _on_error(self, item):
+        line_no = item.data(Qt.ItemDataRole.UserRole)
+        self._show_page(line_no // self.PAGE_LINES)
+        block = self.view.document().findBlockByNumber(line_no % self.PAGE_LINES)
+        cursor = QTextCursor(block)
+        cursor.select(QTextCursor.SelectionType.LineUnderCursor)
+        self.view.setTextCursor(cursor)
+        self.view.centerCursor()
+
+    def _show_page(self, page):
+        total = self._file.line_count if self._file is not None else 0
+        pages = max(1, -(-total // self.PAGE_LINES))
+        self._page = max(0, min(page, pages - 1))
+        start = self._page * self.PAGE_LINES
+        self.view.setPlainText(self._file.lines(start, self.PAGE_LINES) if total else "")
+        self.btn_prev.setEnabled(self._page > 0)
+        self.btn_next.setEnabled(self._page < pages - 1)
+        self.page_lbl.setText(
+            f"Lines {start + 1}–{min(start + self.PAGE_LINES, total)} of {total}" if total else ""
+        )
+
+    def done(self, r):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        super().done(r)
+
+
 # ─── Clickable card/header widget (stand-in for Gtk.Button.set_child) ───────
 
 class ClickableFrame(QFrame):
@@ -677,12 +2280,7 @@ class ClickableRow(QWidget):
 class ToastWidget(QFrame):
     def __init__(self, message, button_label=None, on_button=None, parent=None):
         super().__init__(parent)
-        self.setObjectName("toast")
-        self.setStyleSheet(
-            "QFrame#toast { background-color: #2a2a2a; border-radius: 8px; }"
-            "QFrame#toast QLabel { color: #f0f0f0; }"
-            "QFrame#toast QPushButton { color: #66c0f4; font-weight: bold; }"
-        )
+        self.setObjectName("toast")  # styled by _BASE_QSS
         lay = QHBoxLayout(self)
         lay.setContentsMargins(16, 10, 10, 10)
         lay.setSpacing(10)
@@ -695,7 +2293,6 @@ class ToastWidget(QFrame):
             lay.addWidget(btn)
         close_btn = QToolButton()
         close_btn.setText("✕")
-        close_btn.setStyleSheet("QToolButton { color: #aaaaaa; border: none; }")
         close_btn.clicked.connect(self.deleteLater)
         lay.addWidget(close_btn)
 
@@ -820,13 +2417,13 @@ class SimpleListPanel(QScrollArea):
         name_lbl.setTextFormat(Qt.TextFormat.RichText)
         name_lbl.setText(_to_richtext(row.markup))
         size_lbl = QLabel(row.size)
-        size_lbl.setStyleSheet("color: gray; font-size: 9pt;")
+        size_lbl.setProperty("role", "muted")
         labels.addWidget(name_lbl)
         labels.addWidget(size_lbl)
         h.addLayout(labels, 1)
 
         status_lbl = QLabel(row.status)
-        status_lbl.setStyleSheet("font-size: 9pt;")
+        status_lbl.setProperty("role", "status")
         h.addWidget(status_lbl)
 
         outer._row = row
@@ -837,6 +2434,583 @@ class SimpleListPanel(QScrollArea):
             w.setVisible(predicate(row))
 
 
+# ─── Recyclable card widgets ─────────────────────────────────────────────────
+# Every filter change, flavor-combo change or reload used to delete every
+# card and then rebuild the exact same frames, checkboxes, labels and
+# per-widget stylesheets from scratch — and parsing those stylesheets (plus
+# the style polish that follows) was most of what a rebuild cost. The
+# classes below build their widget tree and set their styles ONCE, in
+# __init__; after that a rebuild only rebinds them to new KernelRow data
+# (text, tooltip, check state) via bind(). Widgets released by a rebuild
+# go back into a WidgetPool for the next one instead of being destroyed.
+
+class WidgetPool:
+    """Free lists of recyclable widgets, keyed by kind.
+
+    Released widgets are reparented to a hidden holder (rather than
+    setParent(None), which would turn them into hidden top-level windows)
+    and handed back out by acquire(). Anything with a recycle(pool) method
+    gets it called on release, so a card can return its own body's rows to
+    the pool and drop references to the rows it was bound to.
+    """
+
+    # Upper bound per kind — past this, released widgets are destroyed, so
+    # one unusually large rebuild can't pin its widgets forever.
+    _MAX_FREE = 1500
+
+    def __init__(self):
+        self.holder = QWidget()
+        self._free = {}
+        # Called with every widget handed back out of a free list (the
+        # theme repolisher catches up widgets that sat out a theme switch).
+        self.on_acquire = None
+
+    def acquire(self, kind, factory):
+        free = self._free.get(kind)
+        if free:
+            w = free.pop()
+            if self.on_acquire is not None:
+                self.on_acquire(w)
+            return w
+        w = factory()
+        w._pool_kind = kind
+        return w
+
+    def release(self, w):
+        recycle = getattr(w, "recycle", None)
+        if recycle is not None:
+            recycle(self)
+        free = self._free.setdefault(w._pool_kind, [])
+        if len(free) >= self._MAX_FREE:
+            w.setParent(None)
+            w.deleteLater()
+            return
+        w.setParent(self.holder)
+        free.append(w)
+
+    def release_layout(self, layout, keep=0):
+        """Empty `layout` (except its last `keep` items, e.g. a trailing
+        stretch): pooled widgets are released, anything else is deleted."""
+        while layout.count() > keep:
+            w = layout.takeAt(0).widget()
+            if w is None:
+                continue
+            if hasattr(w, "_pool_kind"):
+                self.release(w)
+            else:
+                w.setParent(None)
+                w.deleteLater()
+
+
+class PackageRowWidget(QWidget):
+    """One package row inside a card body: checkbox, name, size, status."""
+
+    def __init__(self):
+        super().__init__()
+        lay = QHBoxLayout(self)
+        lay.setContentsMargins(24, 4, 12, 4)
+        lay.setSpacing(10)
+
+        self.chk = QCheckBox()
+        self.chk.toggled.connect(self._on_toggled)
+        lay.addWidget(self.chk)
+
+        self.name_lbl = QLabel()
+        self.name_lbl.setTextFormat(Qt.TextFormat.RichText)
+        lay.addWidget(self.name_lbl, 1)
+
+        self.size_lbl = QLabel()
+        self.size_lbl.setProperty("role", "muted")
+        lay.addWidget(self.size_lbl)
+
+        self.status_lbl = QLabel()
+        self.status_lbl.setProperty("role", "status")
+        lay.addWidget(self.status_lbl)
+
+        self._row = None
+        self._on_toggle = None
+        self._check_maps = ()
+
+    def bind(self, row, on_toggle, mark_gpu_irrelevant=False, check_maps=()):
+        """Show `row`; `on_toggle(row, checked)` fires on user toggles.
+        With mark_gpu_irrelevant, packages for absent GPU hardware are
+        struck through and can't be selected (Mainline flavor sections).
+        The widget registers itself as row -> widget in every dict in
+        `check_maps` and takes itself out again when recycled, so a
+        group's map never points at a widget bound to some other row."""
+        self._row = row
+        self._on_toggle = on_toggle
+        self._check_maps = check_maps
+        for m in check_maps:
+            m[row] = self
+        tip = (
+            f"{row.name}\n{row.version or ''}\n"
+            f"{'Installed' if row.is_installed else 'Not installed'}"
+            + (" (running)" if row.is_active else "")
+            + ("\nHeld — won't auto-upgrade" if row.is_held else "")
+        )
+        self.chk.blockSignals(True)
+        try:
+            self.chk.setChecked(row.is_selected)
+        finally:
+            self.chk.blockSignals(False)
+        self.chk.setToolTip(tip)
+        self.name_lbl.setToolTip(tip)
+        if mark_gpu_irrelevant and not row.gpu_relevant:
+            self.name_lbl.setText(_to_richtext(
+                f"<span style='color:gray'><s>{row.name}</s></span>"
+                f"  <small><span style='color:orange'>no matching GPU</span></small>"
+            ))
+            self.chk.setEnabled(False)
+        else:
+            self.name_lbl.setText(_to_richtext(row.markup))
+            self.chk.setEnabled(True)
+        self.size_lbl.setText(row.size)
+        self.status_lbl.setText(row.status)
+
+    def sync_check(self):
+        """Re-read row.is_selected without firing on_toggle (used after a
+        group-header click changes selection programmatically)."""
+        if self._row is not None:
+            self.chk.blockSignals(True)
+            try:
+                self.chk.setChecked(self._row.is_selected)
+            finally:
+                self.chk.blockSignals(False)
+
+    def recycle(self, pool):
+        for m in self._check_maps:
+            if m.get(self._row) is self:
+                del m[self._row]
+        self._check_maps = ()
+        self._row = None
+        self._on_toggle = None
+
+    def _on_toggled(self, checked):
+        if self._on_toggle is not None:
+            self._on_toggle(self._row, checked)
+
+
+def _make_category_label() -> QLabel:
+    lbl = QLabel()
+    lbl.setProperty("role", "category")
+    return lbl
+
+
+class GroupCard(QFrame):
+    """A collapsible group: chevron, clickable header with a tristate
+    "group" checkbox, and a body built lazily by a callback on first
+    expand.
+
+    nested=False is a top-level card (Mainline version, XanMod/Liquorix
+    group, Meta); nested=True is a flavor sub-section inside a Mainline
+    version card, with its own indent and no frame.
+    """
+
+    expandedChanged = pyqtSignal(bool)
+    # Body built / torn down (by evict_body() or recycling) — what
+    # BodyCache keeps its accounting on.
+    bodyBuilt = pyqtSignal()
+    bodyReleased = pyqtSignal()
+
+    def __init__(self, nested=False):
+        super().__init__()
+        self.nested = nested
+        vbox = QVBoxLayout(self)
+        vbox.setContentsMargins(0, 0, 0, 0)
+        vbox.setSpacing(0)
+
+        header_row = QWidget()
+        header_row_lay = QHBoxLayout(header_row)
+
+        self.chevron = QToolButton()
+        self.chevron.setText("▸")
+        self.chevron.setAutoRaise(True)
+        self.chevron.clicked.connect(self.toggle)
+        header_row_lay.addWidget(self.chevron)
+
+        self.header_btn = ClickableFrame()
+        self.header_btn.clicked.connect(self._on_header_clicked)
+        header_inner = QHBoxLayout(self.header_btn)
+
+        self.grp_check = QCheckBox()
+        self.grp_check.setEnabled(False)  # visual indicator only — header click drives selection
+        # Disabled widgets never receive mouse events in Qt, and critically
+        # those events do NOT bubble up to the parent ClickableFrame either —
+        # they are simply dropped. Without this, clicking directly on the
+        # checkbox glyph (the most natural place to click) silently does
+        # nothing, even though clicking the label right next to it works.
+        # Making it transparent for mouse events lets clicks (and tooltip
+        # hover) fall through to header_btn underneath.
+        self.grp_check.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, True)
+        self.grp_check.setTristate(True)
+
+        self.title_lbl = QLabel()
+        self.title_lbl.setTextFormat(Qt.TextFormat.RichText)
+
+        self.hint_lbl = QLabel()
+        self.hint_lbl.setProperty("role", "hint")
+        self.hint_lbl.setVisible(False)
+
+        if nested:
+            header_row_lay.setContentsMargins(24, 6, 12, 6)
+            header_row_lay.setSpacing(8)
+            self.chevron.setProperty("role", "sectionChevron")
+            header_row_lay.addWidget(self.grp_check)
+            header_inner.setContentsMargins(0, 0, 0, 0)
+            header_inner.setSpacing(8)
+        else:
+            self.setObjectName("card")
+            self.setContentsMargins(0, 8, 0, 2)
+            header_row_lay.setContentsMargins(0, 0, 0, 0)
+            header_row_lay.setSpacing(0)
+            self.chevron.setProperty("role", "chevron")
+            header_inner.setContentsMargins(0, 10, 12, 10)
+            header_inner.setSpacing(12)
+            header_inner.addWidget(self.grp_check)
+        header_inner.addWidget(self.title_lbl, 1)
+        header_inner.addWidget(self.hint_lbl)
+        header_row_lay.addWidget(self.header_btn, 1)
+        vbox.addWidget(header_row)
+
+        if not nested:
+            sep = QFrame()
+            sep.setFrameShape(QFrame.Shape.HLine)
+            vbox.addWidget(sep)
+
+        self.body = QWidget()
+        self.body_layout = QVBoxLayout(self.body)
+        self.body_layout.setContentsMargins(0, 0, 0, 0)
+        self.body_layout.setSpacing(0)
+        self.body.setVisible(False)
+        vbox.addWidget(self.body)
+
+        self._reset()
+
+    def _reset(self):
+        self.body_built = False
+        self._body_builder = None
+        self._on_header_click = None
+        self._expand_tip = self._collapse_tip = ""
+        # Whatever the card's owner wants to keep alongside it for the
+        # lifetime of one binding (check maps, row lists, ...).
+        self.ctx = {}
+
+    def bind(self, title_html, tooltip, body_builder, on_header_click,
+             expand_tip, collapse_tip, hint=""):
+        """Point this card at a new group. body_builder(card) fills
+        card.body_layout on first expand; on_header_click() runs when the
+        header is clicked."""
+        self.title_lbl.setText(_to_richtext(title_html))
+        self.header_btn.setToolTip(tooltip)
+        self.grp_check.setToolTip(tooltip)  # belt-and-braces alongside WA_TransparentForMouseEvents
+        self.hint_lbl.setText(hint)
+        self.hint_lbl.setVisible(bool(hint))
+        self._body_builder = body_builder
+        self._on_header_click = on_header_click
+        self._expand_tip, self._collapse_tip = expand_tip, collapse_tip
+        self._set_chevron(False)
+
+    def ensure_body(self):
+        if not self.body_built and self._body_builder is not None:
+            self.body_built = True
+            self._body_builder(self)
+            self.bodyBuilt.emit()
+
+    def evict_body(self, pool):
+        """Tear down a built body, keeping the binding: the next expand
+        runs the body builder again. Selection lives on the KernelRows, so
+        nothing is lost."""
+        if self.body_built:
+            pool.release_layout(self.body_layout)
+            self.body_built = False
+            self.bodyReleased.emit()
+
+    def is_expanded(self) -> bool:
+        return not self.body.isHidden()
+
+    def toggle(self, checked=False):
+        self.set_expanded(not self.is_expanded())
+
+    def set_expanded(self, expand: bool):
+        if expand:
+            self.ensure_body()
+        if expand == self.is_expanded():
+            return
+        self.body.setVisible(expand)
+        self._set_chevron(expand)
+        self.expandedChanged.emit(expand)
+
+    def _set_chevron(self, expanded):
+        self.chevron.setText("▾" if expanded else "▸")
+        self.chevron.setToolTip(self._collapse_tip if expanded else self._expand_tip)
+
+    def _on_header_clicked(self):
+        if self._on_header_click is not None:
+            self._on_header_click()
+
+    def recycle(self, pool):
+        self.evict_body(pool)
+        self.body.setVisible(False)
+        self._reset()
+
+
+class BodyCache:
+    """Bounds how many card-body items (rows, labels, nested sections) are
+    alive at once.
+
+    Every GroupCard is watch()ed once, when the pool first creates it.
+    Built bodies are counted by their layout items; those of collapsed
+    cards sit in an LRU ordered by when they were collapsed (or built, if
+    prebuilt collapsed), and once the total passes `budget`, the
+    least-recently collapsed ones are evicted back to the pool. Expanded
+    bodies are never evicted, so the budget is a target rather than a hard
+    cap while the user keeps lots of cards open.
+    """
+
+    def __init__(self, pool: WidgetPool, budget: int):
+        self.pool = pool
+        self.budget = budget
+        self.live = 0
+        self._sizes = {}          # card -> items in its built body
+        self._idle = OrderedDict()  # collapsed built cards, oldest first
+
+    def watch(self, card: "GroupCard"):
+        card.bodyBuilt.connect(lambda c=card: self._built(c))
+        card.bodyReleased.connect(lambda c=card: self._released(c))
+        card.expandedChanged.connect(lambda e, c=card: self._expanded(c, e))
+        return card
+
+    def has_room(self, fraction=0.75) -> bool:
+        """Below `fraction` of the budget — the idle prebuilder stops here
+        so that speculative bodies never push out ones the user opened."""
+        return self.live < self.budget * fraction
+
+    def _built(self, card):
+        size = card.body_layout.count()
+        self._sizes[card] = size
+        self.live += size
+        if not card.is_expanded():
+            self._idle[card] = None
+        # The card being built may be just about to expand — never evict it.
+        self._trim(keep=card)
+
+    def _released(self, card):
+        self.live -= self._sizes.pop(card, 0)
+        self._idle.pop(card, None)
+
+    def _expanded(self, card, expanded):
+        if expanded:
+            self._idle.pop(card, None)
+        elif card in self._sizes:
+            self._idle[card] = None
+            self._idle.move_to_end(card)
+            self._trim()
+
+    def _trim(self, keep=None):
+        while self.live > self.budget and self._idle:
+            card = next(iter(self._idle))
+            if card is keep:
+                break
+            card.evict_body(self.pool)  # -> _released()
+
+
+# ─── Progressive card rendering ──────────────────────────────────────────────
+# Time budget per event-loop turn for building cards. 8 ms leaves the other
+# half of a 60 Hz frame for Qt's own layout/paint work.
+RENDER_BUDGET_MS = 8
+
+
+class ProgressiveRenderer:
+    """Fills one tab's card column a time-budgeted slice at a time.
+
+    render() takes (key, factory) specs in display order. Each event-loop
+    turn builds as many cards as fit in RENDER_BUDGET_MS (always at least
+    one), starting with the ones inside the scroll viewport: if a card with
+    the same key as the one previously at the top of the viewport is still
+    in the list, rendering starts there and the view stays anchored on it
+    while the cards above it are filled in afterwards. Otherwise it starts
+    from the top.
+
+    Cancellation works on generation numbers handed in by the caller (the
+    KernelManager's _rebuild_generation): a pending slice whose generation
+    is no longer this renderer's latest simply stops.
+    """
+
+    def __init__(self, scroll: QScrollArea, box: QVBoxLayout, pool: WidgetPool):
+        self.scroll = scroll
+        self.box = box
+        self.pool = pool
+        self.gen = 0
+        self.done = True
+        self._keys = {}  # built widget -> spec key
+        # Called (no arguments) whenever a render finishes.
+        self.on_done = None
+
+    def cards(self):
+        """Built card widgets, top to bottom."""
+        box = self.box
+        return [box.itemAt(i).widget() for i in range(box.count() - 1)]
+
+    def render(self, gen, specs, empty_factory=None):
+        anchor_key, anchor_offset = self._viewport_anchor()
+        self.gen = gen
+        self.pool.release_layout(self.box, keep=1)
+        self._keys = {}
+        if not specs:
+            self.done = True
+            if empty_factory is not None:
+                self.box.insertWidget(0, empty_factory())
+            if self.on_done is not None:
+                self.on_done()
+            return
+
+        start = next((i for i, (k, _f) in enumerate(specs) if k == anchor_key), 0)
+        restore = start > 0
+        # The viewport (and everything below it) first, then the cards above.
+        order = list(range(start, len(specs))) + list(range(start - 1, -1, -1))
+        state = {"next": 0, "built": [], "anchor": None}
+        self.done = False
+
+        def step():
+            if gen != self.gen:
+                return  # superseded — abort
+            deadline = time.perf_counter() + RENDER_BUDGET_MS / 1000
+            built = state["built"]
+            while state["next"] < len(order):
+                i = order[state["next"]]
+                state["next"] += 1
+                key, factory = specs[i]
+                w = factory()
+                pos = bisect.bisect(built, i)
+                built.insert(pos, i)
+                self.box.insertWidget(pos, w)
+                self._keys[w] = key
+                if state["anchor"] is None:
+                    state["anchor"] = w
+                if time.perf_counter() >= deadline:
+                    break
+            if restore:
+                self._pin(state["anchor"], anchor_offset)
+            if state["next"] < len(order):
+                QTimer.singleShot(0, step)
+            else:
+                self.done = True
+                if self.on_done is not None:
+                    self.on_done()
+                if restore:
+                    # Freshly inserted cards are only shown (and get their
+                    # final heights) once their queued show events run.
+                    QTimer.singleShot(0, final_pin)
+
+        def final_pin():
+            if gen == self.gen:
+                self._pin(state["anchor"], anchor_offset)
+
+        step()
+
+    def _viewport_anchor(self):
+        """(key, pixel offset) of the first card visible at the top of the
+        scroll viewport, or (None, 0)."""
+        top = self.scroll.verticalScrollBar().value()
+        if top <= 0:
+            return None, 0
+        for w in self.cards():
+            if w.y() + w.height() > top and w in self._keys:
+                return self._keys[w], w.y() - top
+        return None, 0
+
+    def cards_near_viewport(self, margin_screens=1.0):
+        """Built cards overlapping the viewport extended by `margin_screens`
+        viewport heights above and below, nearest-first (visible ones, then
+        alternating below/above)."""
+        cards = self.cards()
+        if not cards:
+            return []
+        top = self.scroll.verticalScrollBar().value()
+        height = self.scroll.viewport().height()
+        margin = int(height * margin_screens)
+        lo = bisect.bisect_right(cards, top - margin, key=lambda w: w.y() + w.height())
+        hi = bisect.bisect_left(cards, top + height + margin, key=lambda w: w.y())
+        center = (top + height // 2)
+        return sorted(cards[lo:hi], key=lambda w: abs(w.y() + w.height() // 2 - center))
+
+    def _pin(self, anchor, offset):
+        """Keep `anchor` at the same place in the viewport while cards are
+        being inserted above it."""
+        # The scroll area only resizes its content widget (and with it the
+        # scrollbar range) once the posted LayoutRequest is processed, which
+        # is too late here — do it now so setValue() isn't clamped.
+        container = self.scroll.widget()
+        container.ensurePolished()  # fresh cards' real heights depend on their styles
+        self.box.activate()
+        container.resize(container.width(), max(container.sizeHint().height(),
+                                                self.scroll.viewport().height()))
+        self.scroll.verticalScrollBar().setValue(max(0, anchor.y() - offset))
+
+
+# Per-tick budget for speculative body building. Smaller than the render
+# budget: this work is optional and must never be what delays a click.
+PREBUILD_BUDGET_MS = 4
+
+
+class IdlePrebuilder:
+    """Builds the bodies of collapsed cards near the scroll position while
+    the event loop has nothing better to do, so expanding one of them is
+    just a visibility toggle.
+
+    Nearest cards go first; within a card, an expanded card's flavor
+    sections are prebuilt before collapsed cards' bodies, since those are
+    the next thing a user can click. Work happens only for the tab that's
+    on screen, never while its renderer is still building, and in ticks of
+    at most PREBUILD_BUDGET_MS (one body is the smallest unit of work).
+    Anything further than a screen away stays lazy, and prebuilding stops
+    once the BodyCache is three-quarters full.
+    """
+
+    def __init__(self, renderer: ProgressiveRenderer, bodies: "BodyCache"):
+        self.renderer = renderer
+        self.bodies = bodies
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._tick)
+        renderer.scroll.verticalScrollBar().valueChanged.connect(self.schedule)
+        renderer.on_done = self.schedule
+
+    def schedule(self, *_):
+        # A short delay so a scroll gesture in progress isn't interrupted.
+        self._timer.start(50)
+
+    def _candidates(self):
+        near = self.renderer.cards_near_viewport()
+        for card in near:
+            if isinstance(card, GroupCard) and card.is_expanded():
+                for child in _body_children(card):
+                    if isinstance(child, GroupCard) and not child.body_built:
+                        yield child
+        for card in near:
+            if isinstance(card, GroupCard) and not card.body_built:
+                yield card
+
+    def _tick(self):
+        r = self.renderer
+        if not r.done or not r.scroll.isVisible():
+            return
+        deadline = time.perf_counter() + PREBUILD_BUDGET_MS / 1000
+        for card in self._candidates():
+            if not self.bodies.has_room():
+                return
+            card.ensure_body()
+            if time.perf_counter() >= deadline:
+                self._timer.start(0)  # more to do — continue on the next idle turn
+                return
+
+
+def _body_children(card):
+    lay = card.body_layout
+    return [lay.itemAt(i).widget() for i in range(lay.count())]
+
+
 # ─── App & Window ─────────────────────────────────────────────────────────────
 
 class KernelManagerWindow(QMainWindow):
@@ -849,6 +3023,9 @@ class KernelManagerWindow(QMainWindow):
 
         self.manager = KernelManager(self)
         self.setCentralWidget(self.manager.toast_overlay)
+        self._repolisher = ThemeRepolisher()
+        self.manager._pool.on_acquire = self._repolisher.sync
+        self.last_theme_switch_ms = 0.0
         self.apply_color_scheme()
 
         # Kick things off shortly after the window is shown, mirroring the
@@ -857,17 +3034,22 @@ class KernelManagerWindow(QMainWindow):
 
     def _on_window_realized(self):
         loading = QLabel("Loading package cache…")
-        loading.setStyleSheet("margin-top: 40px;")
+        loading.setProperty("role", "empty")
         loading.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-        self.manager._mainline_box.addWidget(loading)
+        box = self.manager._mainline_box
+        box.insertWidget(box.count() - 1, loading)
         self.manager._reload_kernels_async()
         if AUTO_OFFER_ADD_REPO:
             QTimer.singleShot(0, self.manager._maybe_offer_add_repos)
         # Check for updates a couple of seconds after window appears
         QTimer.singleShot(3000, self.manager._check_for_app_update)
 
-    def apply_color_scheme(self):
-        dark = load_config().get("dark_mode", True)
+    def apply_color_scheme(self, dark=None) -> float:
+        """Switch to the dark or light theme (default: the configured one);
+        returns how long the switch took, in milliseconds."""
+        if dark is None:
+            dark = load_config().get("dark_mode", True)
+        t0 = time.perf_counter()
         app = QApplication.instance()
         # Base window/text/button colors are set via QPalette rather than a
         # QSS "QWidget { ... }" rule. A universal QWidget selector forces Qt
@@ -877,7 +3059,18 @@ class KernelManagerWindow(QMainWindow):
         # QPalette changes propagate to all widgets without that per-widget
         # CSS re-matching cost, so toggling is effectively instant.
         app.setPalette(_build_palette(dark))
-        app.setStyleSheet(_DARK_QSS if dark else _LIGHT_QSS)
+        # The stylesheet itself never changes after startup (see
+        # _APP_QSS) — only the "theme" property its rules are scoped by —
+        # so Qt re-matches nothing on its own and ThemeRepolisher decides
+        # what gets repolished, and when.
+        if app.styleSheet() != _APP_QSS:
+            app.setStyleSheet(_APP_QSS)
+        self._repolisher.apply(
+            (self, self.manager._pool.holder), "dark" if dark else "light"
+        )
+        ms = (time.perf_counter() - t0) * 1000
+        self.last_theme_switch_ms = ms
+        return ms
 
     def closeEvent(self, event):
         cfg = load_config()
@@ -885,6 +3078,9 @@ class KernelManagerWindow(QMainWindow):
         cfg["auto_remove_after_install"] = self.manager.chk_auto_rm.isChecked()
         save_config(cfg)
         self.manager._end_log_session()
+        if self.manager._helper_session is not None:
+            self.manager._helper_session.close()
+        self.manager._log.writer.stop()
         super().closeEvent(event)
 
 
@@ -919,8 +3115,35 @@ def _build_palette(dark: bool) -> QPalette:
 # bare "QWidget { ... }" rule. Class selectors only match instances of that
 # class, so re-polishing on theme switch stays cheap no matter how many
 # widgets the Mainline tab has built.
+#
+# Per-widget looks that don't change with the theme live in _BASE_QSS,
+# selected by object name or a "role" property, instead of each widget
+# carrying its own setStyleSheet() string — every one of those is a
+# separately parsed sheet that Qt re-parses whenever the widget is
+# repolished.
+_BASE_QSS = """
+QLabel[role="muted"] { color: gray; font-size: 9pt; }
+QLabel[role="status"] { font-size: 9pt; }
+QLabel[role="category"] { color: gray; font-size: 8pt; margin-left: 16px; margin-top: 6px; }
+QLabel[role="hint"] { color: orange; font-size: 9pt; }
+QLabel[role="badge"] { color: #6fcf6f; font-size: 9pt; }
+QLabel[role="title"] { font-weight: bold; font-size: 13pt; }
+QLabel[role="empty"] { margin-top: 40px; }
+QToolButton[role="chevron"] { border: none; font-size: 11pt; padding: 0 8px; }
+QToolButton[role="sectionChevron"] { border: none; }
+QPushButton#installButton { font-weight: bold; }
+QPushButton#removeButton { color: #e05050; font-weight: bold; }
+QFrame#toast { background-color: #2a2a2a; border-radius: 8px; }
+QFrame#toast QLabel { color: #f0f0f0; }
+QFrame#toast QPushButton { color: #66c0f4; font-weight: bold; }
+QFrame#toast QToolButton { color: #aaaaaa; border: none; }
+QFrame#pkexecWarn { background-color: #5a4a1a; border: 1px solid #a08030; border-radius: 4px; }
+QFrame#pkexecWarn QLabel { color: #fdf0c8; }
+QFrame#pkexecWarn QToolButton { color: #fdf0c8; border: none; }
+"""
+
 _DARK_QSS = """
-QLineEdit, QTextEdit, QComboBox { background-color: #2a475e; color: #c7d5e0;
+QLineEdit, QTextEdit, QPlainTextEdit, QComboBox { background-color: #2a475e; color: #c7d5e0;
     border: 1px solid #3a5a75; border-radius: 4px; padding: 3px; }
 QPushButton { background-color: #2a475e; color: #c7d5e0; border: 1px solid #3a5a75;
     border-radius: 4px; padding: 5px 10px; }
@@ -936,7 +3159,7 @@ QCheckBox { spacing: 6px; }
 """
 
 _LIGHT_QSS = """
-QLineEdit, QTextEdit, QComboBox { background-color: #ffffff; color: #1c1c1c;
+QLineEdit, QTextEdit, QPlainTextEdit, QComboBox { background-color: #ffffff; color: #1c1c1c;
     border: 1px solid #b8c0c8; border-radius: 4px; padding: 3px; }
 QPushButton { background-color: #e8ebee; color: #1c1c1c; border: 1px solid #b8c0c8;
     border-radius: 4px; padding: 5px 10px; }
@@ -952,7 +3175,126 @@ QCheckBox { spacing: 6px; }
 """
 
 
-class KernelManagerApp(QApplication):
+def _scope_qss(qss: str, theme: str) -> str:
+    """Prefix every selector in `qss` with a *[theme="<theme>"] ancestor
+    match, so the rules only apply under a widget carrying that property."""
+    rules = []
+    for block in qss.split("}"):
+        if "{" not in block:
+            continue
+        selectors, body = block.split("{", 1)
+        scoped = ", ".join(f'*[theme="{theme}"] {sel.strip()}' for sel in selectors.split(","))
+        rules.append(f"{scoped} {{{body}}}")
+    return "\n".join(rules)
+
+
+# Both themes in one sheet, built once: switching themes flips the "theme"
+# property on the top-level widgets instead of handing Qt a new sheet to
+# parse and re-match against every widget in the app.
+_APP_QSS = _BASE_QSS + _scope_qss(_DARK_QSS, "dark") + "\n" + _scope_qss(_LIGHT_QSS, "light")
+
+
+def _themed_targets(*sheets):
+    """(class name, object name or None) for the subject of every selector
+    in `sheets` whose rule differs between them — the only widgets whose
+    style can change on a theme switch."""
+    bodies = []
+    for qss in sheets:
+        rules = {}
+        for block in qss.split("}"):
+            if "{" in block:
+                selectors, body = block.split("{", 1)
+                for sel in selectors.split(","):
+                    rules[sel.strip()] = " ".join(body.split())
+        bodies.append(rules)
+    targets = set()
+    for sel in set().union(*bodies):
+        if len({rules.get(sel) for rules in bodies}) > 1:
+            m = re.match(r"(\w+)(?:#(\w+))?", sel.split()[-1])
+            targets.add((m.group(1), m.group(2)))
+    return sorted(targets, key=str)
+
+
+_THEMED_TARGETS = _themed_targets(_DARK_QSS, _LIGHT_QSS)
+
+
+class ThemeRepolisher(QObject):
+    """Brings widgets up to date after the "theme" property changes.
+
+    Only widgets some theme-dependent rule can match (_THEMED_TARGETS —
+    buttons, inputs, tabs, cards) are repolished at all; plain labels and
+    rows get their new colors from the palette. Visible ones are repolished
+    right away. A hidden subtree (collapsed card body, inactive tab, pooled
+    widget) is only marked stale and repolished when it's next shown, or,
+    for pooled widgets, when the pool hands it out again (sync()). So a
+    switch costs what's on screen, not what's been built.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._stale = {}
+
+    def apply(self, roots, theme: str):
+        for w in self._stale:
+            try:
+                w.removeEventFilter(self)
+            except RuntimeError:  # deleted since the last switch
+                pass
+        self._stale = {}
+        for root in roots:
+            root.setProperty("theme", theme)
+            if root.isVisible():
+                self._repolish_tree(root)
+            else:
+                # e.g. the widget pool's holder: each child is handed out
+                # on its own, so each is tracked on its own.
+                for child in root.findChildren(QWidget, options=Qt.FindChildOption.FindDirectChildrenOnly):
+                    self._defer(child)
+
+    def sync(self, w):
+        if w in self._stale:
+            self._undefer(w)
+            self._repolish_tree(w)
+
+    def _repolish_tree(self, root):
+        stack = [root]
+        while stack:
+            w = stack.pop()
+            if self._themed(w):
+                style = w.style()
+                style.unpolish(w)
+                style.polish(w)
+                w.update()
+            for child in w.findChildren(QWidget, options=Qt.FindChildOption.FindDirectChildrenOnly):
+                if child.isHidden():
+                    self._defer(child)
+                else:
+                    stack.append(child)
+
+    @staticmethod
+    def _themed(w) -> bool:
+        return any(
+            w.inherits(cls) and (name is None or w.objectName() == name)
+            for cls, name in _THEMED_TARGETS
+        )
+
+    def _defer(self, w):
+        if w not in self._stale:
+            self._stale[w] = None
+            w.installEventFilter(self)
+
+    def _undefer(self, w):
+        del self._stale[w]
+        w.removeEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Show and obj in self._stale:
+            self._undefer(obj)
+            self._repolish_tree(obj)
+        return False
+
+
+class KernelManagerApp(QApplication):
     def __init__(self, argv):
         super().__init__(argv)
         self.setApplicationName(APP_ID)
@@ -971,16 +3313,25 @@ class KernelManager:
         self.cache = None
         self.kernels = []
         self.running_release = platform.uname().release
-        self._pre_modules = set()
+        self._plan_events = []
+        self._queue = OperationQueue()
+        cfg = load_config()
+        self._helper_session = (
+            HelperSession(HELPER_PATH, int(cfg["helper_session_idle_secs"]), self._helper_options)
+            if cfg["helper_session"] else None
+        )
         self.busy = False
-        self._log_handle = None
         self._pkexec_fail_count = 0
+        self._log_session = None  # path of the session log being written
         self._search_debounce_timer = QTimer()
         self._search_debounce_timer.setSingleShot(True)
         self._search_debounce_timer.timeout.connect(self._do_refilter)
         self._rebuild_generation = 0  # incremented on each rebuild request to cancel stale ones
 
         self._dispatch = MainThreadDispatcher()
+        # Recycled cards / package rows shared by every tab (see WidgetPool)
+        self._pool = WidgetPool()
+        self._bodies = BodyCache(self._pool, int(load_config().get("card_body_budget", 3000)))
 
         # Flat row lists (replace Gio.ListStore)
         self.rows_xanmod = []
@@ -988,12 +3339,42 @@ class KernelManager:
         self.rows_meta = []
         # Mainline: keyed by kver string, value = list of KernelRow
         self._mainline_groups = {}
+        # Mainline kvers, newest first — sorted once per inventory instead
+        # of on every rebuild.
+        self._mainline_versions = []
+        # Facet bitsets over every row above (see FacetIndex), the filter
+        # box's trigram index over the same rows (see SearchIndex), and the
+        # structured-query compiler built on both (see FilterQuery)
+        self._index = FacetIndex([])
+        self._search = SearchIndex(self._index)
+        self._query = FilterQuery(self._index, self._search, self._version_cmp)
+        # Rows the filter box text matches, as of the last _refilter_all
+        self._filter_mask = -1
+        # The selection and its running counts (see SelectionModel), and
+        # per-group header/tooltip aggregates (see GroupAggregates)
+        self._selection = SelectionModel(self._index)
+        self._aggregates = GroupAggregates(self._index)
+        # Precompiled NVIDIA module packages per kernel (see
+        # NvidiaModuleMatrix), and the driver branch they're matched
+        # against — None without an NVIDIA driver in use
+        self._nvidia = NvidiaModuleMatrix([])
+        self._nvidia_branch = None
+        # XanMod (version, psABI) / Liquorix version -> rows bitset, in
+        # display order — grouped once per inventory, not per rebuild.
+        self._xanmod_groups = {}
+        self._liquorix_groups = {}
         # Currently selected XanMod flavor filter ("any" means show all)
         self._xanmod_flavor_filter = "any"
         # Currently selected Mainline flavor filter — defaults to Generic
         # (see MAINLINE_DEFAULT_FLAVOR_FILTER) since that's what most
         # people are looking for; "Any" shows everything, unfiltered.
         self._mainline_flavor_filter = MAINLINE_DEFAULT_FLAVOR_FILTER
+        # Mainline history window: versions shown per flavor (grows by one
+        # page per "Show older" click, back to one page per inventory), and
+        # the flavor labels each kver has, for counting against it.
+        self._mainline_page = max(1, int(load_config().get("mainline_window", 6)))
+        self._mainline_window = self._mainline_page
+        self._mainline_kver_flavors = {}
 
         self.main_box = QWidget()
         self.main_layout = QVBoxLayout(self.main_box)
@@ -1147,17 +3528,17 @@ class KernelManager:
         if GPU_VENDORS:
             badge_text = " + ".join(sorted(v.upper() for v in GPU_VENDORS)) + " Detected"
             badge = QLabel(badge_text)
-            badge.setStyleSheet("color: #6fcf6f; font-size: 9pt;")
+            badge.setProperty("role", "badge")
             layout.addWidget(badge)
 
         layout.addStretch(1)
 
         title_box = QVBoxLayout()
         title_lbl = QLabel("Multi-Kernel Manager")
-        title_lbl.setStyleSheet("font-weight: bold; font-size: 13pt;")
+        title_lbl.setProperty("role", "title")
         title_lbl.setAlignment(Qt.AlignmentFlag.AlignHCenter)
         subtitle_lbl = QLabel("XanMod • Liquorix • Mainline")
-        subtitle_lbl.setStyleSheet("color: gray; font-size: 9pt;")
+        subtitle_lbl.setProperty("role", "muted")
         subtitle_lbl.setAlignment(Qt.AlignmentFlag.AlignHCenter)
         title_box.addWidget(title_lbl)
         title_box.addWidget(subtitle_lbl)
@@ -1186,7 +3567,7 @@ class KernelManager:
 
         self.btn_install = QPushButton("⬇  Install Selected")
         self.btn_install.clicked.connect(self._install_selected)
-        self.btn_install.setStyleSheet("QPushButton { font-weight: bold; }")
+        self.btn_install.setObjectName("installButton")
         toolbar.addWidget(self.btn_install)
 
         self.btn_install_hold = QPushButton("⬇🔒 Install + Hold")
@@ -1199,7 +3580,7 @@ class KernelManager:
 
         self.btn_remove = QPushButton("✕  Remove Selected")
         self.btn_remove.clicked.connect(self._remove_selected)
-        self.btn_remove.setStyleSheet("QPushButton { color: #e05050; font-weight: bold; }")
+        self.btn_remove.setObjectName("removeButton")
         toolbar.addWidget(self.btn_remove)
 
         self.btn_hold = QPushButton("🔒 Hold")
@@ -1228,6 +3609,21 @@ class KernelManager:
         self.spinner.setTextVisible(False)
         self.spinner.setVisible(False)
         toolbar.addWidget(self.spinner)
+        self.queue_label = QLabel()
+        self.queue_label.setProperty("role", "muted")
+        self.queue_label.setVisible(False)
+        toolbar.addWidget(self.queue_label)
+        self.btn_clear_queue = QToolButton()
+        self.btn_clear_queue.setText("✕")
+        self.btn_clear_queue.setToolTip("Drop the queued operations")
+        self.btn_clear_queue.clicked.connect(self._clear_queue)
+        self.btn_clear_queue.setVisible(False)
+        toolbar.addWidget(self.btn_clear_queue)
+        self._busy_text = ""
+        self._last_activity = time.monotonic()
+        self._stall_timer = QTimer()
+        self._stall_timer.setInterval(5000)
+        self._stall_timer.timeout.connect(self._check_stalled)
 
         # Warning banner — shown when pkexec fails repeatedly (non-root context).
         # This banner always keeps its own fixed warm/dark colors regardless of
@@ -1236,10 +3632,7 @@ class KernelManager:
         # theme's near-black text on this dark background and becomes
         # unreadable.
         self._pkexec_warn_bar = QFrame()
-        self._pkexec_warn_bar.setStyleSheet(
-            "QFrame { background-color: #5a4a1a; border: 1px solid #a08030; border-radius: 4px; }"
-            "QFrame QLabel { color: #fdf0c8; }"
-        )
+        self._pkexec_warn_bar.setObjectName("pkexecWarn")
         warn_layout = QHBoxLayout(self._pkexec_warn_bar)
         warn_layout.addWidget(QLabel(
             "⚠  Privilege escalation (pkexec) failed multiple times.  "
@@ -1247,7 +3640,6 @@ class KernelManager:
         ))
         warn_close = QToolButton()
         warn_close.setText("✕")
-        warn_close.setStyleSheet("QToolButton { color: #fdf0c8; border: none; }")
         warn_close.clicked.connect(lambda: self._pkexec_warn_bar.setVisible(False))
         warn_layout.addWidget(warn_close)
         self._pkexec_warn_bar.setVisible(False)
@@ -1262,7 +3654,15 @@ class KernelManager:
         self.main_layout.addWidget(search_widget)
         search_box.addWidget(QLabel("Filter:"))
         self.search_entry = QLineEdit()
-        self.search_entry.setPlaceholderText("Search all kernels…")
+        self.search_entry.setPlaceholderText("Search all kernels…  (or e.g. status:installed held:no kver<6.5)")
+        self.search_entry.setToolTip(
+            "Plain words match package names and kernel versions.\n"
+            "Field terms narrow further and can be combined:\n"
+            "  flavor:generic,lowlatency   psabi:v3   family:xanmod|liquorix|meta|mainline\n"
+            "  status:installed|available|active|held   held:yes|no\n"
+            "  category:headers   gpu:relevant|hidden\n"
+            "  kver>=6.8   kver<6.5   kver:6.14   (Debian version ordering)"
+        )
         self.search_entry.textChanged.connect(self._on_search_changed)
         search_box.addWidget(self.search_entry)
 
@@ -1276,6 +3676,12 @@ class KernelManager:
         self.stack.addTab(self._build_liquorix_tab(), "Liquorix")
         self.stack.addTab(self._build_mainline_tab(), "Mainline")
 
+        self._prebuilders = [
+            IdlePrebuilder(r, self._bodies) for r in
+            (self._xanmod_renderer, self._liquorix_renderer, self._mainline_renderer)
+        ]
+        self.stack.currentChanged.connect(lambda _i: [p.schedule() for p in self._prebuilders])
+
         self.main_layout.addWidget(self.stack, 1)
 
     def _build_xanmod_tab(self) -> QWidget:
@@ -1303,7 +3709,7 @@ class KernelManager:
         flavor_layout.addWidget(self.flavor_combo)
 
         flavor_hint = QLabel("ℹ  v1=baseline · v2=SSE4 · v3=AVX2 · v4=AVX-512 · edge=latest")
-        flavor_hint.setStyleSheet("color: gray; font-size: 9pt;")
+        flavor_hint.setProperty("role", "muted")
         flavor_layout.addWidget(flavor_hint, 1)
 
         info_btn = QToolButton()
@@ -1329,7 +3735,7 @@ class KernelManager:
         else:
             rec_label.setText("Couldn't auto-detect your CPU's supported x86-64 level.")
         rec_label.setTextFormat(Qt.TextFormat.RichText)
-        rec_label.setStyleSheet("color: gray; font-size: 9pt;")
+        rec_label.setProperty("role", "muted")
         rec_label.setWordWrap(True)
         rec_layout.addWidget(rec_label, 1)
         v.addWidget(rec_bar)
@@ -1342,6 +3748,7 @@ class KernelManager:
         self._xanmod_box.setContentsMargins(0, 0, 0, 0)
         self._xanmod_box.addStretch(1)
         self._xanmod_scroll.setWidget(xanmod_container)
+        self._xanmod_renderer = ProgressiveRenderer(self._xanmod_scroll, self._xanmod_box, self._pool)
         v.addWidget(self._xanmod_scroll, 1)
         return xanmod_outer
 
@@ -1359,6 +3766,7 @@ class KernelManager:
         self._liquorix_box.setContentsMargins(0, 0, 0, 0)
         self._liquorix_box.addStretch(1)
         self._liquorix_scroll.setWidget(liquorix_container)
+        self._liquorix_renderer = ProgressiveRenderer(self._liquorix_scroll, self._liquorix_box, self._pool)
         v.addWidget(self._liquorix_scroll)
         return liquorix_outer
 
@@ -1413,7 +3821,7 @@ class KernelManager:
             "ℹ  Generic is the standard kernel — pick a cloud/OEM flavor only if "
             "you're specifically running on that platform."
         )
-        flavor_hint.setStyleSheet("color: gray; font-size: 9pt;")
+        flavor_hint.setProperty("role", "muted")
         flavor_layout.addWidget(flavor_hint, 1)
 
         v.addWidget(flavor_bar)
@@ -1426,13 +3834,14 @@ class KernelManager:
         self._mainline_box.setContentsMargins(0, 0, 0, 0)
         self._mainline_box.addStretch(1)
         self._mainline_scroll.setWidget(mainline_container)
+        self._mainline_renderer = ProgressiveRenderer(self._mainline_scroll, self._mainline_box, self._pool)
         v.addWidget(self._mainline_scroll, 1)
 
         return mainline_outer
 
     def _on_mainline_flavor_changed(self, index):
         self._mainline_flavor_filter = MAINLINE_FLAVOR_FILTERS[index]
-        self._rebuild_mainline_ui(query=self.search_entry.text())
+        self._rebuild_mainline_ui(self._filter_mask)
 
     def _build_log_panel(self):
         """Build the status bar, Details toggle, and log text view."""
@@ -1446,16 +3855,25 @@ class KernelManager:
         self.status_label = QLabel()
         controls.addWidget(self.btn_details)
         controls.addWidget(self.status_label, 1)
+        self._log_browser = None
+        btn_history = QPushButton("Log History…")
+        btn_history.setToolTip("Search and read the logs of past operations")
+        btn_history.clicked.connect(self._show_log_history)
+        controls.addWidget(btn_history)
         self.main_layout.addWidget(controls_widget)
 
         self._log_container = QWidget()
         log_box = QVBoxLayout(self._log_container)
         log_box.setContentsMargins(12, 4, 12, 12)
-        self.textedit = QTextEdit()
+        self.textedit = QPlainTextEdit()
         self.textedit.setReadOnly(True)
-        self.textedit.setFontFamily("monospace")
+        self.textedit.setFont(QFont("monospace"))
         self.textedit.setMinimumHeight(180)
+        self.textedit.setMaximumBlockCount(LOG_VIEW_MAX_LINES)
         log_box.addWidget(self.textedit)
+        self._log = LogSink(self.textedit)
+        self._log.writer = LogWriter(LOG_DIR, load_config())
+        self._log.writer.start()
         self._log_container.setVisible(False)
         self.main_layout.addWidget(self._log_container)
 
@@ -1463,196 +3881,197 @@ class KernelManager:
 
     def _on_flavor_changed(self, index):
         self._xanmod_flavor_filter = XANMOD_FLAVORS[index]
-        self._rebuild_xanmod_ui(query=self.search_entry.text())
+        self._rebuild_xanmod_ui(self._filter_mask)
 
     def _on_search_changed(self, _text):
-        """Debounce search input — only refilter 250 ms after the user stops typing."""
-        self._search_debounce_timer.start(250)
+        """Debounce search input. Matching itself goes through the trigram
+        SearchIndex and costs next to nothing, so this is only a short
+        coalescing window for fast typists / held-down keys, not a wait
+        for the user to stop typing."""
+        self._search_debounce_timer.start(30)
 
     def _do_refilter(self):
         self._refilter_all()
 
+    def _query_mask(self, query: str) -> int:
+        """Bitset of rows matching the filter box text. Malformed field
+        terms are left out — the rest still filter — and the status bar
+        says what was wrong with them."""
+        mask, errors = self._query.evaluate_valid(query)
+        if errors:
+            self.status_push("Filter: " + "; ".join(errors))
+        elif self.status_label.text().startswith("Filter:"):
+            self.status_push("Ready")
+        return mask
+
     def _refilter_all(self):
-        q = self.search_entry.text()
-        self._rebuild_xanmod_ui(query=q)
-        self._rebuild_liquorix_ui(query=q)
+        # Evaluated once here for all three tabs; the single-tab rebuilds
+        # (flavor combos, "Show older") reuse it.
+        self._filter_mask = self._query_mask(self.search_entry.text())
+        self._rebuild_xanmod_ui(self._filter_mask)
+        self._rebuild_liquorix_ui(self._filter_mask)
         # Mainline tab (including meta card) is fully rebuilt on each filter change
-        self._rebuild_mainline_ui(query=q)
+        self._rebuild_mainline_ui(self._filter_mask)
 
     # ── Mainline Grouped UI ───────────────────────────────────────────────────
 
-    def _clear_layout(self, layout):
-        """Remove all widgets from a layout except a trailing stretch item."""
-        while layout.count() > 1:
-            item = layout.takeAt(0)
-            w = item.widget()
-            if w is not None:
-                w.setParent(None)
-                w.deleteLater()
+    def _mainline_flavor_mask(self) -> int:
+        """Bitset of the meta/mainline rows the current Mainline flavor
+        filter accepts. The filter is matched against the few distinct
+        flavor labels in the index, never against individual rows."""
+        filt = self._mainline_flavor_filter
+        idx = self._index
+        if filt == "Any":
+            return idx.mask_any("family", ("meta", "mainline"))
+        return idx.mask_any(
+            "flavor", [lbl for lbl in idx.values("flavor") if _mainline_flavor_matches(lbl, filt)]
+        )
 
-    def _rebuild_mainline_ui(self, query: str = ""):
-        """
-        Build a grouped Mainline view — the single source of truth for the Mainline tab.
-        Uses chunked QTimer scheduling so the Qt event loop stays responsive while
-        building potentially hundreds of widgets. Each call increments a generation
-        counter; stale generators (from superseded searches) abort early.
-        """
+    def _render_tab(self, renderer, specs, empty_factory):
+        """Hand a tab's card specs to its ProgressiveRenderer under a fresh
+        generation, superseding whatever that tab was still building."""
         self._rebuild_generation += 1
-        gen = self._rebuild_generation
+        renderer.render(self._rebuild_generation, specs, empty_factory)
 
-        # Clear all existing children immediately
-        self._clear_layout(self._mainline_box)
+    @staticmethod
+    def _empty_label(text):
+        empty = QLabel(text)
+        empty.setProperty("role", "empty")
+        empty.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        return empty
 
-        query = (query or "").strip().lower()
+    def _rebuild_mainline_ui(self, query_mask: int = -1):
+        """
+        Build a grouped Mainline view — the single source of truth for the Mainline tab.
+        Cards are built by the tab's ProgressiveRenderer in time-budgeted
+        slices, viewport first, so the Qt event loop stays responsive while
+        building potentially hundreds of widgets; a newer rebuild cancels
+        one still in progress.
+        """
         flavor_filt = self._mainline_flavor_filter
+        idx = self._index
+        flavor_mask = self._mainline_flavor_mask()
 
-        # Build the list of "chunks" to render: each chunk is a callable that
-        # appends one card (meta or versioned) to _mainline_box.
-        chunks = []
+        # (key, factory) per card, in display order.
+        specs = []
 
         # ── 1. Meta-packages pinned card ──────────────────────────────────────
         # Flavor-filtered too (a "Generic" filter shouldn't leave every OEM/
         # AWS/Azure/... tracking meta-package cluttering the top of the tab).
-        meta_rows_all = [
-            r for r in self.rows_meta
-            if _mainline_flavor_matches(extract_kernel_flavor(r.name), flavor_filt)
-        ]
-        meta_visible = meta_rows_all if not query else [
-            r for r in meta_rows_all if query in r.name.lower()
-        ]
+        meta_visible = idx.rows_in(idx.mask("family", "meta") & flavor_mask & query_mask)
         if meta_visible:
-            chunks.append(lambda mv=meta_visible: self._mainline_box.insertWidget(
-                self._mainline_box.count() - 1, self._build_meta_card(mv)
-            ))
+            meta_mask = idx.mask("family", "meta") & flavor_mask
+            specs.append(("meta", lambda mv=meta_visible, m=meta_mask: self._build_meta_card(mv, m)))
 
         # ── 2. Versioned kernel cards sorted newest-first ─────────────────────
-        sorted_vers = sorted(
-            self._mainline_groups.keys(),
-            key=cmp_to_key(lambda a, b: -self._version_cmp(a, b))
+        # Windowed: a version gets a card if it's among the newest
+        # self._mainline_window matching versions of any flavor it has, or
+        # if anything in it is installed. Everything older is one "Show
+        # older" card, so render work follows the window, not the archive
+        # (see window_mainline_versions). The flavor filter applies first —
+        # a version with no Generic-flavored packages at all (e.g. a kernel
+        # Ubuntu only ever shipped as -aws) simply doesn't show up while
+        # "Generic" is selected, instead of showing up with an empty card.
+        shown, older = window_mainline_versions(
+            idx, self._mainline_versions, self._mainline_kver_flavors,
+            flavor_mask, query_mask, self._mainline_window,
         )
+        for kver, kver_mask in shown:
+            # Capture loop variables in default args. Rows are materialized
+            # inside the factory, so cards that end up cancelled never pay
+            # for it.
+            specs.append((kver, lambda kv=kver, m=kver_mask: self._build_version_card(
+                kv, idx.rows_in(m & query_mask), m
+            )))
+        if older:
+            specs.append(("older", lambda n=older: self._build_show_older_card(n)))
+
+        if flavor_filt != "Any":
+            empty_text = (
+                f"No {flavor_filt} mainline kernels found.\n"
+                "Try a different flavor filter above, or click Refresh."
+            )
+        else:
+            empty_text = "No mainline kernels found in apt cache.\nTry clicking Refresh."
+        self._render_tab(self._mainline_renderer, specs, lambda: self._empty_label(empty_text))
+
+    def _build_show_older_card(self, n_older: int) -> QWidget:
+        """Paging card at the bottom of the Mainline tab: widens the history
+        window by one page."""
+        btn = QPushButton(
+            f"Show {min(n_older, self._mainline_page)} older kernel version(s)"
+            f"  ({n_older} not shown)"
+        )
+        btn.setToolTip(
+            f"Only the newest {self._mainline_window} versions per flavor (plus anything "
+            "installed) are listed.\nThe window applies after filtering, so searching for an "
+            "old version still finds it."
+        )
+        btn.clicked.connect(self._show_older_mainline)
+        return btn
 
-        for kver in sorted_vers:
-            rows_all_flavors = self._mainline_groups[kver]
-            if not rows_all_flavors:
-                continue
-            # Flavor filter first — a version with no Generic-flavored
-            # packages at all (e.g. a kernel Ubuntu only ever shipped as
-            # -aws) simply doesn't show up while "Generic" is selected,
-            # instead of showing up with an empty/irrelevant card.
-            rows = [
-                r for r in rows_all_flavors
-                if _mainline_flavor_matches(extract_kernel_flavor(r.name), flavor_filt)
-            ]
-            if not rows:
-                continue
-            visible_rows = rows if not query else [
-                r for r in rows if query in r.name.lower() or query in kver
-            ]
-            if not visible_rows:
-                continue
-            # Capture loop variables in default args
-            chunks.append(lambda kv=kver, vr=visible_rows, allr=rows: (
-                self._mainline_box.insertWidget(
-                    self._mainline_box.count() - 1, self._build_version_card(kv, vr, allr)
-                )
-            ))
-
-        if not chunks:
-            if flavor_filt != "Any":
-                empty = QLabel(
-                    f"No {flavor_filt} mainline kernels found.\n"
-                    "Try a different flavor filter above, or click Refresh."
-                )
-            else:
-                empty = QLabel("No mainline kernels found in apt cache.\nTry clicking Refresh.")
-            empty.setStyleSheet("margin-top: 40px;")
-            empty.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-            self._mainline_box.insertWidget(self._mainline_box.count() - 1, empty)
-            return
-
-        # Dispatch chunks one-per-cycle so Qt can process events between each card
-        chunk_iter = iter(chunks)
-
-        def dispatch_next():
-            if gen != self._rebuild_generation:
-                return  # superseded — abort
-            try:
-                next(chunk_iter)()
-            except StopIteration:
-                return  # done
-            QTimer.singleShot(0, dispatch_next)
-
-        QTimer.singleShot(0, dispatch_next)
+    def _show_older_mainline(self, *_):
+        self._mainline_window += self._mainline_page
+        self._rebuild_mainline_ui(self._filter_mask)
 
     # ── Shared group-selection helpers (version cards, flavor sub-groups,
     #    and the meta-package card all use these) ──────────────────────────
 
-    def _split_group_targets(self, rows):
-        """Split a group of rows into (need_install, need_removal) — i.e.
-        packages that aren't installed yet vs. installed-but-inactive ones."""
-        need_install = [r for r in rows if r.gpu_relevant and not r.is_active and not r.is_installed]
-        need_removal = [r for r in rows if r.gpu_relevant and not r.is_active and r.is_installed]
-        return need_install, need_removal
-
-    def _group_click_targets(self, rows):
-        """What a single click on a group header should select: the
-        not-yet-installed packages if there are any (so one click installs
-        exactly what's missing and never re-touches anything already
-        installed); otherwise the installed/inactive ones, so the same
-        click is still useful for a one-shot removal once everything in
-        the group is already installed."""
-        need_install, need_removal = self._split_group_targets(rows)
-        return need_install if need_install else need_removal
-
-    def _update_group_tristate(self, rows, check_map, grp_check):
-        target = self._group_click_targets(rows)
-        if not target:
-            grp_check.setCheckState(Qt.CheckState.Unchecked)
-            return
-        n_sel = sum(1 for r in target if r.is_selected)
-        if n_sel == 0:
-            grp_check.setCheckState(Qt.CheckState.Unchecked)
-        elif n_sel == len(target):
-            grp_check.setCheckState(Qt.CheckState.Checked)
-        else:
-            grp_check.setCheckState(Qt.CheckState.PartiallyChecked)
+    def _attach_group(self, card, group):
+        """Make `card`'s tristate checkbox follow `group` from now on (until
+        the card is recycled and its ctx reset)."""
+        card.ctx["group"] = group
+        if card not in group.cards:
+            group.cards.append(card)
+        card.grp_check.setCheckState(group.check_state())
+
+    def _set_selected(self, row, checked):
+        if self._selection.set(row, checked):
+            self._selection_changed()
+
+    def _selection_changed(self):
+        """Refresh the checkboxes of the groups the last change touched,
+        then the action buttons."""
+        for group in self._selection.take_dirty():
+            group.cards = [c for c in group.cards if c.ctx.get("group") is group]
+            for card in group.cards:
+                card.grp_check.setCheckState(group.check_state())
+        self._update_buttons()
 
-    def _make_group_header_click(self, rows, check_map, grp_check):
+    def _make_group_header_click(self, group, check_map):
         def _on_click():
-            target = self._group_click_targets(rows)
-            if not target:
+            if not group.size:
                 return
-            new_state = not all(r.is_selected for r in target)
-            for r in target:
-                r.is_selected = new_state
-                chk = check_map.get(r)
-                if chk is not None:
-                    chk.blockSignals(True)
-                    try:
-                        chk.setChecked(new_state)
-                    finally:
-                        chk.blockSignals(False)
-            self._update_group_tristate(rows, check_map, grp_check)
-            self._update_buttons()
+            new_state = group.selected < group.size
+            for r in self._index.rows_in(group.target):
+                if self._selection.set(r, new_state):
+                    w = check_map.get(r)
+                    if w is not None:
+                        w.sync_check()
+            self._selection_changed()
         return _on_click
 
-    def _group_tooltip(self, label, rows):
-        need_install, need_removal = self._split_group_targets(rows)
-        cats = sorted({pkg_category(r.name) for r in rows})
-        cat_text = " + ".join(cats) if cats else "packages"
-        if need_install:
+    def _group_tooltip(self, label, stats: GroupStats):
+        cat_text = " + ".join(stats.categories) if stats.categories else "packages"
+        size_text = f"\nTotal size: {self._fmt_bytes(stats.total_bytes)}" if stats.total_bytes else ""
+        if stats.n_install:
             return (
-                f"{label}\nClick to select {len(need_install)} package(s) not yet "
-                f"installed ({cat_text}).\nAlready-installed packages are left alone."
+                f"{label}\nClick to select {stats.n_install} package(s) not yet "
+                f"installed ({cat_text}).\nAlready-installed packages are left alone.{size_text}"
             )
-        if need_removal:
+        if stats.n_remove:
             return (
                 f"{label}\nEverything here is already installed.\n"
-                f"Click to select all {len(need_removal)} package(s) for removal."
+                f"Click to select all {stats.n_remove} package(s) for removal.{size_text}"
             )
-        return f"{label}\nNothing to install or remove — this is up to date."
+        return f"{label}\nNothing to install or remove — this is up to date.{size_text}"
+
+    def _new_card(self, nested=False):
+        """Pool factory for GroupCards: every card is watched by the body
+        cache for its whole (pooled) life."""
+        return self._bodies.watch(GroupCard(nested=nested))
 
-    def _build_version_card(self, kver: str, visible_rows: list, all_rows: list) -> QFrame:
+    def _build_version_card(self, kver: str, visible_rows: list, all_mask: int) -> QFrame:
         """
         Build a single versioned kernel card (e.g. 6.14.0-37).
 
@@ -1676,302 +4095,126 @@ class KernelManager:
         the first time each is expanded, and cached after that — so a
         collapsed Mainline tab stays down to a handful of widgets per
         version no matter how many historical kernels are listed.
-        """
-        frame = QFrame()
-        frame.setObjectName("card")
-        frame.setContentsMargins(0, 8, 0, 2)
-
-        vbox = QVBoxLayout(frame)
-        vbox.setContentsMargins(0, 0, 0, 0)
-        vbox.setSpacing(0)
-
-        # ── Header row: chevron (expand/collapse) + clickable select area ──
-        header_row = QWidget()
-        header_row_lay = QHBoxLayout(header_row)
-        header_row_lay.setContentsMargins(0, 0, 0, 0)
-        header_row_lay.setSpacing(0)
-
-        chevron_btn = QToolButton()
-        chevron_btn.setText("▸")
-        chevron_btn.setToolTip("Expand to show kernel flavors (Generic, Low Latency, OEM, …)")
-        chevron_btn.setAutoRaise(True)
-        chevron_btn.setStyleSheet("QToolButton { border: none; font-size: 11pt; padding: 0 8px; }")
-        header_row_lay.addWidget(chevron_btn)
-
-        header_btn = ClickableFrame()
-        header_inner = QHBoxLayout(header_btn)
-        header_inner.setContentsMargins(0, 10, 12, 10)
-        header_inner.setSpacing(12)
-
-        grp_check = QCheckBox()
-        grp_check.setEnabled(False)  # visual indicator only — header click drives selection
-        # Disabled widgets never receive mouse events in Qt, and critically
-        # those events do NOT bubble up to the parent ClickableFrame either —
-        # they are simply dropped. Without this, clicking directly on the
-        # checkbox glyph (the most natural place to click) silently does
-        # nothing, even though clicking the label right next to it works.
-        # Making it transparent for mouse events lets clicks (and tooltip
-        # hover) fall through to header_btn underneath.
-        grp_check.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, True)
-        grp_check.setTristate(True)
-        header_inner.addWidget(grp_check)
 
-        ver_label = QLabel()
-        ver_label.setTextFormat(Qt.TextFormat.RichText)
-        any_active    = any(r.is_active    for r in all_rows)
-        any_installed = any(r.is_installed for r in all_rows)
+        The card itself comes out of self._pool (see GroupCard) and is only
+        rebound here, not constructed.
+        """
+        card = self._pool.acquire("card", self._new_card)
+        stats = self._aggregates.stats(all_mask)
 
         # Flavor badges — so "which of these is OEM vs Azure vs Generic?"
         # is answered right here in the collapsed header, instead of
         # requiring the user to expand the card and search through it.
-        flavor_labels = sorted(
-            {extract_kernel_flavor(r.name) for r in all_rows},
-            key=_flavor_sort_key
-        )
-        # Strip the "(HWE 22.04)" / "(64k pages)" parenthetical for the
-        # badge line — it's still visible in the flavor sub-section itself,
-        # but at a glance "Generic, Generic, OEM" from two HWE variants
-        # reads worse than just "Generic, OEM".
-        badge_bases = list(dict.fromkeys(re.sub(r"\s*\(.*?\)", "", f) for f in flavor_labels))
-        badges_html = " · ".join(badge_bases)
-
-        if any_active:
-            ver_label.setText(_to_richtext(
-                f"<b>Kernel {kver}</b>  "
-                f"<span style='color:green'><b>[Active]</b></span>"
-                f"  <small>({len(all_rows)} packages · {badges_html})</small>"
-            ))
-        elif any_installed:
-            ver_label.setText(_to_richtext(
-                f"<b>Kernel {kver}</b>  "
-                f"<span style='color:gray'>[Installed]</span>"
-                f"  <small>({len(all_rows)} packages · {badges_html})</small>"
-            ))
-        else:
-            ver_label.setText(_to_richtext(
-                f"<b>Kernel {kver}</b>  "
-                f"<span style='color:#88cc88'>[Available]</span>"
-                f"  <small>({len(all_rows)} packages · {badges_html})</small>"
-            ))
-        header_inner.addWidget(ver_label, 1)
+        badges_html = " · ".join(stats.badges)
 
-        gpu_rows = [r for r in all_rows if not r.gpu_relevant]
-        if gpu_rows:
-            gpu_hint = QLabel("⚠ Some GPU pkgs hidden (no matching GPU)")
-            gpu_hint.setStyleSheet("color: orange; font-size: 9pt;")
-            header_inner.addWidget(gpu_hint)
-
-        header_row_lay.addWidget(header_btn, 1)
-        vbox.addWidget(header_row)
-
-        sep = QFrame()
-        sep.setFrameShape(QFrame.Shape.HLine)
-        vbox.addWidget(sep)
+        if stats.any_active:
+            status_tag = "<span style='color:green'><b>[Active]</b></span>"
+        elif stats.any_installed:
+            status_tag = "<span style='color:gray'>[Installed]</span>"
+        else:
+            status_tag = "<span style='color:#88cc88'>[Available]</span>"
+        title = (
+            f"<b>Kernel {kver}</b>  {status_tag}"
+            f"  <small>({stats.n} packages · {badges_html})</small>"
+        )
 
-        # ── Body: one collapsible section per kernel flavor — built lazily ──
-        body = QWidget()
-        body_lay = QVBoxLayout(body)
-        body_lay.setContentsMargins(0, 0, 0, 0)
-        body_lay.setSpacing(0)
-        vbox.addWidget(body)
-        body.setVisible(False)  # collapsed by default — expand via chevron
+        hints = []
+        if stats.n_gpu_hidden:
+            hints.append("⚠ Some GPU pkgs hidden (no matching GPU)")
+        if self._nvidia_branch:
+            gaps = sorted({r.flavor_label for r in visible_rows if r.category.startswith("Image")
+                           and not self._nvidia.module_for(kver, r.flavor_label, self._nvidia_branch)},
+                          key=_flavor_sort_key)
+            if gaps:
+                hints.append(f"⚠ No precompiled NVIDIA {self._nvidia_branch} modules: {', '.join(gaps)}")
+        hint = " · ".join(hints)
 
         pkg_check_map = {}  # ALL rows in this card, for the version-level header
-        state = {"built": False}
-
-        def _build_flavor_groups():
-            if state["built"]:
-                return
-            state["built"] = True
+        group = self._selection.group(all_mask)
 
+        def _build_flavor_groups(c):
             flavors = {}
             for r in visible_rows:
-                flavors.setdefault(extract_kernel_flavor(r.name), []).append(r)
-            ordered_flavors = sorted(flavors.keys(), key=_flavor_sort_key)
-
-            for flavor in ordered_flavors:
-                frows = flavors[flavor]
-                body_lay.addWidget(self._build_flavor_section(kver, flavor, frows, all_rows, pkg_check_map, grp_check))
-
-        def _toggle_body(checked=False):
-            _build_flavor_groups()
-            expand = not body.isVisible()
-            body.setVisible(expand)
-            chevron_btn.setText("▾" if expand else "▸")
-            chevron_btn.setToolTip(
-                "Collapse" if expand else
-                "Expand to show kernel flavors (Generic, Low Latency, OEM, …)"
-            )
-        chevron_btn.clicked.connect(_toggle_body)
+                flavors.setdefault(r.flavor_label, []).append(r)
+            for flavor in sorted(flavors.keys(), key=_flavor_sort_key):
+                c.body_layout.addWidget(self._build_flavor_section(
+                    kver, flavor, flavors[flavor], pkg_check_map,
+                    all_mask & self._index.mask("flavor", flavor)
+                ))
 
         # ── Version-level header click selects across ALL flavors at once ──
         # (Works correctly even before the body is expanded/built: selection
         # state lives on the KernelRow objects themselves, not the widgets —
         # any not-yet-built checkboxes simply pick up r.is_selected once
         # they're eventually created.)
-        header_btn.clicked.connect(
-            self._make_group_header_click(all_rows, pkg_check_map, grp_check)
+        card.bind(
+            title,
+            self._group_tooltip(f"Kernel {kver} — every flavor below", stats),
+            _build_flavor_groups,
+            self._make_group_header_click(group, pkg_check_map),
+            "Expand to show kernel flavors (Generic, Low Latency, OEM, …)",
+            "Collapse",
+            hint=hint,
         )
-        _kver_tip = self._group_tooltip(f"Kernel {kver} — every flavor below", all_rows)
-        header_btn.setToolTip(_kver_tip)
-        grp_check.setToolTip(_kver_tip)  # belt-and-braces alongside WA_TransparentForMouseEvents
-        self._update_group_tristate(all_rows, pkg_check_map, grp_check)
+        self._attach_group(card, group)
+        return card
 
-        return frame
+    _CAT_ORDER = [
+        "Image", "Image (unsigned/uc)", "Image (OEM)",
+        "Headers", "Modules", "Modules Extra",
+        "Modules Extra (GEP)", "Modules NVIDIA", "Cloud Tools", "Other"
+    ]
 
-    def _build_flavor_section(self, kver, flavor, frows, all_rows, pkg_check_map, grp_check) -> QWidget:
+    def _build_flavor_section(self, kver, flavor, frows, pkg_check_map, group_mask) -> QWidget:
         """One collapsible flavor sub-group (Generic / Low Latency / OEM / …)
         within a version card. Its package rows are themselves built lazily,
-        the first time this flavor is expanded."""
-        flavor_any_active = any(r.is_active for r in frows)
-
-        flavor_section = QWidget()
-        flavor_lay = QVBoxLayout(flavor_section)
-        flavor_lay.setContentsMargins(0, 0, 0, 0)
-        flavor_lay.setSpacing(0)
-
-        f_header_row = QWidget()
-        f_header_lay = QHBoxLayout(f_header_row)
-        f_header_lay.setContentsMargins(24, 6, 12, 6)
-        f_header_lay.setSpacing(8)
-
-        f_chevron = QToolButton()
-        f_chevron.setText("▸")
-        f_chevron.setAutoRaise(True)
-        f_chevron.setToolTip("Show the individual packages in this flavor")
-        f_chevron.setStyleSheet("QToolButton { border: none; }")
-        f_header_lay.addWidget(f_chevron)
-
-        f_grp_check = QCheckBox()
-        f_grp_check.setEnabled(False)
-        # See the matching comment in _build_version_card — disabled widgets
-        # swallow mouse events instead of passing them to the parent frame.
-        f_grp_check.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, True)
-        f_grp_check.setTristate(True)
-        f_header_lay.addWidget(f_grp_check)
-
-        f_header_btn = ClickableFrame()
-        f_inner = QHBoxLayout(f_header_btn)
-        f_inner.setContentsMargins(0, 0, 0, 0)
-        f_inner.setSpacing(8)
+        the first time this flavor is expanded. frows are the flavor's rows
+        the search box left visible; group_mask is the whole flavor, which
+        keys its selection group (see _build_simple_group_card)."""
+        section = self._pool.acquire("section", lambda: self._new_card(nested=True))
 
+        mask = FacetIndex.mask_of_rows(frows)
+        stats = self._aggregates.stats(mask)
         status_tag = ""
-        if flavor_any_active:
+        if stats.any_active:
             status_tag = "  <span style='color:green'><b>[Active]</b></span>"
-        elif all(r.is_installed for r in frows):
+        elif stats.all_installed:
             status_tag = "  <span style='color:gray'>[Installed]</span>"
-        f_name_lbl = QLabel()
-        f_name_lbl.setTextFormat(Qt.TextFormat.RichText)
-        f_name_lbl.setText(_to_richtext(
-            f"<b>{flavor}</b>{status_tag}  <small>({len(frows)} packages)</small>"
-        ))
-        f_inner.addWidget(f_name_lbl, 1)
-        f_header_lay.addWidget(f_header_btn, 1)
-
-        flavor_lay.addWidget(f_header_row)
-
-        # Package rows — built lazily, the first time this flavor is expanded.
-        f_rows_container = QWidget()
-        f_rows_lay = QVBoxLayout(f_rows_container)
-        f_rows_lay.setContentsMargins(0, 0, 0, 0)
-        f_rows_lay.setSpacing(0)
-        f_rows_container.setVisible(False)
-        flavor_lay.addWidget(f_rows_container)
 
         flavor_check_map = {}
-        state = {"built": False}
+        group = self._selection.group(group_mask)
 
-        CAT_ORDER = [
-            "Image", "Image (unsigned/uc)", "Image (OEM)",
-            "Headers", "Modules", "Modules Extra",
-            "Modules Extra (GEP)", "Modules NVIDIA", "Cloud Tools", "Other"
-        ]
-
-        def _build_pkg_rows():
-            if state["built"]:
-                return
-            state["built"] = True
+        def _build_pkg_rows(c):
             cats = {}
             for r in frows:
                 cats.setdefault(r.category, []).append(r)
-            ordered_cats = sorted(cats.keys(), key=lambda c: CAT_ORDER.index(c) if c in CAT_ORDER else 99)
-
-            for cat in ordered_cats:
-                cat_label = QLabel(cat)
-                cat_label.setStyleSheet("color: gray; font-size: 8pt; margin-left: 16px; margin-top: 6px;")
-                f_rows_lay.addWidget(cat_label)
-
+            order = self._CAT_ORDER
+            for cat in sorted(cats.keys(), key=lambda c_: order.index(c_) if c_ in order else 99):
+                cat_label = self._pool.acquire("category", _make_category_label)
+                cat_label.setText(cat)
+                c.body_layout.addWidget(cat_label)
                 for r in cats[cat]:
-                    pkg_widget = QWidget()
-                    pkg_box = QHBoxLayout(pkg_widget)
-                    pkg_box.setContentsMargins(24, 4, 12, 4)
-                    pkg_box.setSpacing(10)
-
-                    chk = QCheckBox()
-                    chk.setChecked(r.is_selected)
-                    flavor_check_map[r] = chk
-                    pkg_check_map[r] = chk
-
-                    tip = (
-                        f"{r.name}\n{r.version or ''}\n"
-                        f"{'Installed' if r.is_installed else 'Not installed'}"
-                        + (" (running)" if r.is_active else "")
-                        + ("\nHeld — won't auto-upgrade" if r.is_held else "")
-                    )
-
-                    def _on_pkg_check(checked, row=r, fcm=flavor_check_map, fgc=f_grp_check,
-                                       acm=pkg_check_map, agc=grp_check, arows=all_rows, frows_=frows):
-                        row.is_selected = checked
-                        self._update_group_tristate(frows_, fcm, fgc)
-                        self._update_group_tristate(arows, acm, agc)
-                        self._update_buttons()
-
-                    chk.toggled.connect(_on_pkg_check)
-                    chk.setToolTip(tip)
-                    pkg_box.addWidget(chk)
-
-                    name_lbl = QLabel()
-                    name_lbl.setTextFormat(Qt.TextFormat.RichText)
-                    name_lbl.setToolTip(tip)
-                    if not r.gpu_relevant:
-                        name_lbl.setText(_to_richtext(
-                            f"<span style='color:gray'><s>{r.name}</s></span>"
-                            f"  <small><span style='color:orange'>no matching GPU</span></small>"
-                        ))
-                        chk.setEnabled(False)
-                    else:
-                        name_lbl.setText(_to_richtext(r.markup))
-                    pkg_box.addWidget(name_lbl, 1)
-
-                    size_lbl = QLabel(r.size)
-                    size_lbl.setStyleSheet("color: gray; font-size: 9pt;")
-                    pkg_box.addWidget(size_lbl)
-
-                    status_lbl = QLabel(r.status)
-                    status_lbl.setStyleSheet("font-size: 9pt;")
-                    pkg_box.addWidget(status_lbl)
-
-                    f_rows_lay.addWidget(pkg_widget)
-
-        def _toggle_flavor(checked=False, *, container=f_rows_container, btn=f_chevron):
-            _build_pkg_rows()
-            expand = not container.isVisible()
-            container.setVisible(expand)
-            btn.setText("▾" if expand else "▸")
-            btn.setToolTip("Hide packages" if expand else "Show the individual packages in this flavor")
-        f_chevron.clicked.connect(_toggle_flavor)
-
-        f_header_btn.clicked.connect(
-            self._make_group_header_click(frows, flavor_check_map, f_grp_check)
+                    w = self._pool.acquire("pkg", PackageRowWidget)
+                    w.bind(r, self._set_selected, mark_gpu_irrelevant=True,
+                           check_maps=(flavor_check_map, pkg_check_map))
+                    c.body_layout.addWidget(w)
+
+        if any(c.startswith("Image") for c in stats.categories):
+            status_tag += self._nvidia_pairing_tag(kver, flavor)
+
+        section.bind(
+            f"<b>{flavor}</b>{status_tag}  <small>({stats.n} packages)</small>",
+            self._group_tooltip(f"{flavor} — kernel {kver}", stats),
+            _build_pkg_rows,
+            self._make_group_header_click(group, flavor_check_map),
+            "Show the individual packages in this flavor",
+            "Hide packages",
         )
-        _flavor_tip = self._group_tooltip(f"{flavor} — kernel {kver}", frows)
-        f_header_btn.setToolTip(_flavor_tip)
-        f_grp_check.setToolTip(_flavor_tip)  # belt-and-braces alongside WA_TransparentForMouseEvents
-        self._update_group_tristate(frows, flavor_check_map, f_grp_check)
-
-        return flavor_section
+        self._attach_group(section, group)
+        return section
 
-    def _build_simple_group_card(self, title_html: str, rows: list, tooltip: str) -> QFrame:
+    def _build_simple_group_card(self, title_html: str, rows: list, tooltip: str,
+                                 group_mask: int) -> QFrame:
         """
         A card with one clickable header (selects what's needed with a
         single click) and a flat list of package rows below. Used for the
@@ -1988,140 +4231,33 @@ class KernelManager:
         what made switching tabs and toggling light/dark mode noticeably
         laggy. Collapsed, a tab full of these cards costs one header widget
         each instead of a header-plus-N-rows.
-        """
-        frame = QFrame()
-        frame.setObjectName("card")
-        frame.setContentsMargins(0, 8, 0, 2)
-
-        vbox = QVBoxLayout(frame)
-        vbox.setContentsMargins(0, 0, 0, 0)
-        vbox.setSpacing(0)
-
-        # ── Header row: chevron (expand/collapse) + clickable select area ──
-        header_row = QWidget()
-        header_row_lay = QHBoxLayout(header_row)
-        header_row_lay.setContentsMargins(0, 0, 0, 0)
-        header_row_lay.setSpacing(0)
-
-        chevron_btn = QToolButton()
-        chevron_btn.setText("▸")
-        chevron_btn.setToolTip("Expand to show individual packages")
-        chevron_btn.setAutoRaise(True)
-        chevron_btn.setStyleSheet("QToolButton { border: none; font-size: 11pt; padding: 0 8px; }")
-        header_row_lay.addWidget(chevron_btn)
-
-        header_btn = ClickableFrame()
-        header_inner = QHBoxLayout(header_btn)
-        header_inner.setContentsMargins(0, 10, 12, 10)
-        header_inner.setSpacing(12)
-
-        grp_check = QCheckBox()
-        grp_check.setEnabled(False)
-        # See the matching comment in _build_version_card — disabled widgets
-        # swallow mouse events instead of passing them to the parent frame.
-        grp_check.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, True)
-        grp_check.setTristate(True)
-        header_inner.addWidget(grp_check)
-
-        hdr_label = QLabel()
-        hdr_label.setTextFormat(Qt.TextFormat.RichText)
-        hdr_label.setText(_to_richtext(title_html))
-        header_inner.addWidget(hdr_label, 1)
-
-        header_row_lay.addWidget(header_btn, 1)
-        vbox.addWidget(header_row)
-
-        sep = QFrame()
-        sep.setFrameShape(QFrame.Shape.HLine)
-        vbox.addWidget(sep)
-
-        # ── Body: package rows, built lazily on first expand ──────────────
-        body = QWidget()
-        body_lay = QVBoxLayout(body)
-        body_lay.setContentsMargins(0, 0, 0, 0)
-        body_lay.setSpacing(0)
-        vbox.addWidget(body)
-        body.setVisible(False)  # collapsed by default — expand via chevron
 
+        rows are the group's rows left visible by the search box; the
+        selection group is keyed by group_mask, the whole group, so typing
+        a query doesn't register a new SelectionGroup per keystroke.
+        """
+        card = self._pool.acquire("card", self._new_card)
         pkg_check_map = {}
-        state = {"built": False}
-
-        def _build_rows():
-            if state["built"]:
-                return
-            state["built"] = True
+        group = self._selection.group(group_mask)
 
+        def _build_rows(c):
             for r in rows:
-                pkg_widget = QWidget()
-                pkg_box = QHBoxLayout(pkg_widget)
-                pkg_box.setContentsMargins(24, 4, 12, 4)
-                pkg_box.setSpacing(10)
-
-                chk = QCheckBox()
-                chk.setChecked(r.is_selected)
-                pkg_check_map[r] = chk
-                tip = (
-                    f"{r.name}\n{r.version or ''}\n"
-                    f"{'Installed' if r.is_installed else 'Not installed'}"
-                    + (" (running)" if r.is_active else "")
-                    + ("\nHeld — won't auto-upgrade" if r.is_held else "")
-                )
-                chk.setToolTip(tip)
-
-                def _on_check(checked, row=r, check_map=pkg_check_map, grp_chk=grp_check, rs=rows):
-                    row.is_selected = checked
-                    self._update_group_tristate(rs, check_map, grp_chk)
-                    self._update_buttons()
-
-                chk.toggled.connect(_on_check)
-                pkg_box.addWidget(chk)
-
-                name_lbl = QLabel()
-                name_lbl.setTextFormat(Qt.TextFormat.RichText)
-                name_lbl.setText(_to_richtext(r.markup))
-                name_lbl.setToolTip(tip)
-                pkg_box.addWidget(name_lbl, 1)
-
-                size_lbl = QLabel(r.size)
-                size_lbl.setStyleSheet("color: gray; font-size: 9pt;")
-                pkg_box.addWidget(size_lbl)
-
-                status_lbl = QLabel(r.status)
-                status_lbl.setStyleSheet("font-size: 9pt;")
-                pkg_box.addWidget(status_lbl)
-
-                body_lay.addWidget(pkg_widget)
-
-            # Any checkbox states set programmatically (e.g. via a group
-            # click) before this card was ever expanded need to be applied
-            # to the checkboxes we just built.
-            for r, chk in pkg_check_map.items():
-                chk.blockSignals(True)
-                try:
-                    chk.setChecked(r.is_selected)
-                finally:
-                    chk.blockSignals(False)
-
-        def _toggle_body(checked=False):
-            _build_rows()
-            expand = not body.isVisible()
-            body.setVisible(expand)
-            chevron_btn.setText("▾" if expand else "▸")
-            chevron_btn.setToolTip("Collapse" if expand else "Expand to show individual packages")
-        chevron_btn.clicked.connect(_toggle_body)
+                w = self._pool.acquire("pkg", PackageRowWidget)
+                w.bind(r, self._set_selected, check_maps=(pkg_check_map,))
+                c.body_layout.addWidget(w)
 
         # ── Header click selects across the whole group at once — works
         # correctly even before the body is expanded/built, since selection
         # state lives on the KernelRow objects, not the widgets.
-        header_btn.clicked.connect(
-            self._make_group_header_click(rows, pkg_check_map, grp_check)
+        card.bind(
+            title_html, tooltip, _build_rows,
+            self._make_group_header_click(group, pkg_check_map),
+            "Expand to show individual packages", "Collapse",
         )
-        header_btn.setToolTip(tooltip)
-        grp_check.setToolTip(tooltip)  # belt-and-braces alongside WA_TransparentForMouseEvents
-        self._update_group_tristate(rows, pkg_check_map, grp_check)
-        return frame
+        self._attach_group(card, group)
+        return card
 
-    def _build_meta_card(self, meta_rows: list) -> QFrame:
+    def _build_meta_card(self, meta_rows: list, group_mask: int) -> QFrame:
         """Meta/tracking packages (linux-generic, linux-lowlatency, etc.) as
         a single card at the top of the Mainline grouped view."""
         title = (
@@ -2130,7 +4266,9 @@ class KernelManager:
             f"  ({len(meta_rows)} packages)</small>"
         )
         return self._build_simple_group_card(
-            title, meta_rows, self._group_tooltip("Meta / Tracking packages", meta_rows)
+            title, meta_rows,
+            self._group_tooltip("Meta / Tracking packages", self._aggregates.stats_of(meta_rows)),
+            group_mask,
         )
 
     # ── XanMod / Liquorix grouped UI ──────────────────────────────────────────
@@ -2144,15 +4282,14 @@ class KernelManager:
     # name-guessing regex — fixes both: each card is one exact, installable
     # kernel, and its header selects only what that exact kernel needs.
 
-    def _build_xanmod_group_card(self, key, rows: list) -> QFrame:
+    def _build_xanmod_group_card(self, key, rows: list, group_mask: int) -> QFrame:
         version, flavor = key
-        any_active    = any(r.is_active    for r in rows)
-        any_installed = any(r.is_installed for r in rows)
+        stats = self._aggregates.stats_of(rows)
 
         status_tag = ""
-        if any_active:
+        if stats.any_active:
             status_tag = "  <span style='color:green'><b>[Active]</b></span>"
-        elif any_installed:
+        elif stats.any_installed:
             status_tag = "  <span style='color:gray'>[Installed]</span>"
 
         warn_tag = ""
@@ -2167,80 +4304,53 @@ class KernelManager:
 
         title = (
             f"<b>XanMod {version}</b>  <span style='color:#88aaff'>[{flavor}]</span>"
-            f"{status_tag}{warn_tag}{rec_tag}  <small>({len(rows)} packages)</small>"
+            f"{status_tag}{warn_tag}{rec_tag}  <small>({stats.n} packages)</small>"
         )
 
-        tooltip = self._group_tooltip(f"XanMod {version} [{flavor}]", rows)
+        tooltip = self._group_tooltip(f"XanMod {version} [{flavor}]", stats)
         info = XANMOD_FLAVOR_INFO.get(flavor)
         if info:
             tooltip += f"\n\n{info[0]}:\n{info[1]}"
 
-        return self._build_simple_group_card(title, rows, tooltip)
+        return self._build_simple_group_card(title, rows, tooltip, group_mask)
 
-    def _build_liquorix_version_card(self, version: str, rows: list) -> QFrame:
-        any_active    = any(r.is_active    for r in rows)
-        any_installed = any(r.is_installed for r in rows)
+    def _build_liquorix_version_card(self, version: str, rows: list, group_mask: int) -> QFrame:
+        stats = self._aggregates.stats_of(rows)
         status_tag = ""
-        if any_active:
+        if stats.any_active:
             status_tag = "  <span style='color:green'><b>[Active]</b></span>"
-        elif any_installed:
+        elif stats.any_installed:
             status_tag = "  <span style='color:gray'>[Installed]</span>"
 
-        title = f"<b>Liquorix {version}</b>{status_tag}  <small>({len(rows)} packages)</small>"
+        title = f"<b>Liquorix {version}</b>{status_tag}  <small>({stats.n} packages)</small>"
         return self._build_simple_group_card(
-            title, rows, self._group_tooltip(f"Liquorix {version}", rows)
+            title, rows, self._group_tooltip(f"Liquorix {version}", stats), group_mask
         )
 
-    def _rebuild_xanmod_ui(self, query: str = ""):
-        self._clear_layout(self._xanmod_box)
-        query = (query or "").strip().lower()
-
-        groups = {}
-        for r in self.rows_xanmod:
-            if self._xanmod_flavor_filter != "any" and r.flavor != self._xanmod_flavor_filter:
-                continue
-            if query and query not in r.name.lower():
-                continue
-            groups.setdefault((r.version, r.flavor), []).append(r)
-
-        if not groups:
-            empty = QLabel("No XanMod kernels found (or none match the current filter).\nTry clicking Refresh.")
-            empty.setStyleSheet("margin-top: 40px;")
-            empty.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-            self._xanmod_box.insertWidget(self._xanmod_box.count() - 1, empty)
-            return
-
-        def sort_key(k):
-            version, flavor = k
-            rank = XANMOD_FLAVORS.index(flavor) if flavor in XANMOD_FLAVORS else 99
-            return (rank, version)
-
-        for key in sorted(groups.keys(), key=sort_key):
-            self._xanmod_box.insertWidget(
-                self._xanmod_box.count() - 1, self._build_xanmod_group_card(key, groups[key])
-            )
-
-    def _rebuild_liquorix_ui(self, query: str = ""):
-        self._clear_layout(self._liquorix_box)
-        query = (query or "").strip().lower()
+    def _rebuild_xanmod_ui(self, query_mask: int = -1):
+        idx = self._index
+        mask = idx.mask("family", "xanmod") & query_mask
+        if self._xanmod_flavor_filter != "any":
+            mask &= idx.mask("psabi", self._xanmod_flavor_filter)
 
-        groups = {}
-        for r in self.rows_liquorix:
-            if query and query not in r.name.lower():
-                continue
-            groups.setdefault(r.version, []).append(r)
-
-        if not groups:
-            empty = QLabel("No Liquorix kernels found (or none match the current filter).\nTry clicking Refresh.")
-            empty.setStyleSheet("margin-top: 40px;")
-            empty.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-            self._liquorix_box.insertWidget(self._liquorix_box.count() - 1, empty)
-            return
+        specs = [
+            (key, lambda k=key, m=m: self._build_xanmod_group_card(k, idx.rows_in(m & mask), m))
+            for key, m in self._xanmod_groups.items() if m & mask
+        ]
+        self._render_tab(self._xanmod_renderer, specs, lambda: self._empty_label(
+            "No XanMod kernels found (or none match the current filter).\nTry clicking Refresh."
+        ))
 
-        for version in sorted(groups.keys(), key=cmp_to_key(lambda a, b: -self._version_cmp(a, b))):
-            self._liquorix_box.insertWidget(
-                self._liquorix_box.count() - 1, self._build_liquorix_version_card(version, groups[version])
-            )
+    def _rebuild_liquorix_ui(self, query_mask: int = -1):
+        idx = self._index
+        mask = query_mask
+        specs = [
+            (version, lambda v=version, m=m: self._build_liquorix_version_card(v, idx.rows_in(m & mask), m))
+            for version, m in self._liquorix_groups.items() if m & mask
+        ]
+        self._render_tab(self._liquorix_renderer, specs, lambda: self._empty_label(
+            "No Liquorix kernels found (or none match the current filter).\nTry clicking Refresh."
+        ))
 
     # ── Data Collection ───────────────────────────────────────────────────────
 
@@ -2278,11 +4388,21 @@ class KernelManager:
             active    = installed and (run.startswith(version) or version in run)
             held      = name in held_pkgs
             status    = "Active" if active else ("Held" if held and installed else ("Installed" if installed else "Available"))
-            size      = self._fmt_bytes(getattr(cand, "installed_size", 0) or 0)
+            size_bytes = getattr(cand, "installed_size", 0) or 0
+            size      = self._fmt_bytes(size_bytes)
             kver      = extract_kernel_version(name) if (is_generic_kernel_name(name) and not is_meta) else ""
             category  = pkg_category(name) if (is_generic_kernel_name(name) and not is_meta) else ""
             relevant  = gpu_relevant(name)
             flavor    = xanmod_flavor(name) if is_xanmod_name(name) else ""
+            if is_xanmod_name(name):
+                family = "xanmod"
+            elif is_liquorix_name(name):
+                family = "liquorix"
+            elif is_meta:
+                family = "meta"
+            else:
+                family = "mainline"
+            flavor_label = extract_kernel_flavor(name) if family in ("meta", "mainline") else ""
 
             held_tag = "  <span foreground='orange'><b>[Held]</b></span>" if held else ""
             if active:
@@ -2298,8 +4418,10 @@ class KernelManager:
             items.append({
                 "name": name, "version": version, "installed": installed,
                 "active": active, "held": held, "status": status, "size": size,
+                "size_bytes": size_bytes,
                 "markup": markup, "kver": kver, "category": category,
                 "gpu_relevant": relevant, "flavor": flavor, "is_meta": is_meta,
+                "family": family, "flavor_label": flavor_label,
             })
 
         items.sort(key=cmp_to_key(lambda a, b: (
@@ -2317,7 +4439,7 @@ class KernelManager:
             except Exception as e:
                 import traceback
                 detail = traceback.format_exc()
-                self._dispatch.call(self._append_log, f"\n[ERROR] {detail}\n")
+                self._append_log(f"\n[ERROR] {detail}\n")
                 self._dispatch.call(
                     self._error_dialog,
                     "Could not load kernel list",
@@ -2336,6 +4458,8 @@ class KernelManager:
         self.rows_liquorix = []
         self.rows_meta = []
         self._mainline_groups = {}
+        kver_flavors = {}
+        all_rows = []
 
         for k in self.kernels:
             row = KernelRow(
@@ -2346,36 +4470,242 @@ class KernelManager:
                 kver=k.get("kver", ""), category=k.get("category", ""),
                 gpu_relevant=k.get("gpu_relevant", True),
                 flavor=k.get("flavor", ""),
+                flavor_label=k.get("flavor_label", ""),
+                family=k.get("family", ""),
+                size_bytes=k.get("size_bytes", 0),
             )
-            if is_xanmod_name(k["name"]):
+            if row.family == "xanmod":
                 self.rows_xanmod.append(row)
-            elif is_liquorix_name(k["name"]):
+            elif row.family == "liquorix":
                 self.rows_liquorix.append(row)
-            elif k.get("is_meta"):
+            elif row.family == "meta":
                 self.rows_meta.append(row)
             elif is_generic_kernel_name(k["name"]):
                 kv = k.get("kver") or "ungrouped"
+                row.kver = kv
                 self._mainline_groups.setdefault(kv, []).append(row)
-
+                kver_flavors.setdefault(kv, {})[row.flavor_label] = None
+            else:
+                continue
+            all_rows.append(row)
+
+        self._index = FacetIndex(all_rows)
+        self._search = SearchIndex(self._index)
+        self._query = FilterQuery(self._index, self._search, self._version_cmp)
+        self._selection = SelectionModel(self._index)
+        self._aggregates = GroupAggregates(self._index)
+        self._nvidia = NvidiaModuleMatrix(self._index.rows)
+        self._nvidia_branch = self._nvidia_branch_in_use()
+        self._group_xanmod_liquorix()
+        self._mainline_kver_flavors = {kv: tuple(f) for kv, f in kver_flavors.items()}
+        # Flavor sections as they appear unfiltered.
+        idx = self._index
+        for kv, flavors in self._mainline_kver_flavors.items():
+            for f in flavors:
+                self._aggregates.stats(idx.mask("kver", kv) & idx.mask("flavor", f))
+        self._mainline_window = self._mainline_page
+        self._mainline_versions = sorted(
+            self._mainline_groups.keys(),
+            key=cmp_to_key(lambda a, b: -self._version_cmp(a, b))
+        )
         self._refilter_all()
         self._update_buttons()
 
+    def _nvidia_branch_in_use(self):
+        """The NVIDIA driver branch new kernels are matched against: that of
+        the module package installed for the running kernel, else the one
+        the loaded driver reports. None without an NVIDIA GPU."""
+        if "nvidia" not in GPU_VENDORS:
+            return None
+        for row in self._index.rows:
+            if row.is_active and row.kver:
+                branch = self._nvidia.installed_branch(row.kver, row.flavor_label)
+                if branch:
+                    return branch
+        return detect_nvidia_branch()
+
+    def _nvidia_pairing_tag(self, kver, flavor):
+        """Flavor-section header tag: whether this kernel has precompiled
+        modules for the NVIDIA driver branch in use. Empty when there's no
+        NVIDIA driver to match."""
+        branch = self._nvidia_branch
+        if not branch:
+            return ""
+        if self._nvidia.module_for(kver, flavor, branch):
+            return f"  <span style='color:#88cc88'>[NVIDIA {branch} ✓]</span>"
+        return f"  <span style='color:orange'>[no NVIDIA {branch} modules — DKMS build]</span>"
+
+    def _pair_nvidia_modules(self, pkgs):
+        """
+        Offer to add the precompiled linux-modules-nvidia package for the
+        driver branch in use to every mainline kernel image in pkgs that has
+        one, and log the kernels that don't (DKMS builds the driver for
+        those after install). Returns the new package list.
+        """
+        branch = self._nvidia_branch
+        if not branch or not load_config()["nvidia_auto_pair"]:
+            return pkgs
+        by_name = {r.name: r for r in self._index.rows}
+        added, gaps = [], []
+        for name in pkgs:
+            row = by_name.get(name)
+            if row is None or not row.kver or not row.category.startswith("Image"):
+                continue
+            mod = self._nvidia.module_for(row.kver, row.flavor_label, branch)
+            if mod is None:
+                others = self._nvidia.branches(row.kver, row.flavor_label)
+                gaps.append(f"{name} (available: {', '.join(others)})" if others else name)
+            elif not mod.is_installed and mod.name not in pkgs and mod.name not in added:
+                added.append(mod.name)
+        if added and not self._ask_nvidia_pairing(branch, added):
+            self._append_log(f"Not adding precompiled NVIDIA {branch} modules: "
+                             + " ".join(added) + " — DKMS will build the driver\n")
+            added = []
+        if added:
+            self._append_log(f"Pairing with precompiled NVIDIA {branch} modules: "
+                             + " ".join(added) + "\n")
+            self._show_toast(f"Added precompiled NVIDIA {branch} modules for "
+                             f"{len(added)} kernel(s)")
+        if gaps:
+            self._append_log(f"No precompiled NVIDIA {branch} modules for: "
+                             + "; ".join(gaps) + " — DKMS will build the driver\n")
+        return pkgs + added
+
+    def _ask_nvidia_pairing(self, branch, mods):
+        """True to install mods, the precompiled NVIDIA modules found for
+        the kernels being installed, along with them."""
+        box = QMessageBox(self.win)
+        box.setWindowTitle("Precompiled NVIDIA Modules")
+        box.setText(
+            f"The NVIDIA {branch} driver is in use, and the archive has precompiled "
+            f"modules for {len(mods)} of the kernel(s) being installed:\n\n"
+            + "\n".join(mods) + "\n\n"
+            "Install them too? Otherwise DKMS builds the driver after the install."
+        )
+        box.addButton("Use DKMS", QMessageBox.ButtonRole.RejectRole)
+        btn_add = box.addButton("Add Them", QMessageBox.ButtonRole.AcceptRole)
+        box.setDefaultButton(btn_add)
+        box.exec()
+        return box.clickedButton() is btn_add
+
+    def _group_xanmod_liquorix(self):
+        """Bucket XanMod rows by (version, psABI) and Liquorix rows by
+        version into display-ordered bitsets, and warm their aggregates."""
+        idx = self._index
+        xanmod, liquorix = {}, {}
+        for r in idx.rows_in(idx.mask("family", "xanmod")):
+            xanmod.setdefault((r.version, r.flavor), []).append(r.row_id)
+        for r in idx.rows_in(idx.mask("family", "liquorix")):
+            liquorix.setdefault(r.version, []).append(r.row_id)
+
+        def xanmod_order(k):
+            version, flavor = k
+            rank = XANMOD_FLAVORS.index(flavor) if flavor in XANMOD_FLAVORS else 99
+            return (rank, version)
+
+        self._xanmod_groups = {k: _mask_of(xanmod[k]) for k in sorted(xanmod, key=xanmod_order)}
+        self._liquorix_groups = {
+            v: _mask_of(liquorix[v])
+            for v in sorted(liquorix, key=cmp_to_key(lambda a, b: -self._version_cmp(a, b)))
+        }
+        for m in (*self._xanmod_groups.values(), *self._liquorix_groups.values()):
+            self._aggregates.stats(m)
+
     # ── Subprocess Helper ─────────────────────────────────────────────────────
 
-    def _stream_subprocess(self, cmd, on_done):
+    @staticmethod
+    def _helper_options():
+        """xkm-helper options that come from the config."""
+        cfg = load_config()
+        opts = ["--lock-timeout", str(int(cfg["dpkg_lock_timeout_secs"])),
+                "--dkms-preflight-jobs", str(int(cfg["dkms_preflight_jobs"]))]
+        if cfg["dkms_ccache"]:
+            opts += ["--dkms-ccache", str(cfg["dkms_ccache_size"])]
+        return opts
+
+    def _stream_subprocess(self, cmd, on_done, on_event=None):
+        """Run cmd, streaming its output into the log, then call
+        on_done(rc, output) on the GUI thread. xkm-helper runs are started
+        with --events; each record is handled here (apt error hints, step
+        timings) and also passed to on_event on the GUI thread. With the
+        "helper_session" option they go to the running HelperSession
+        instead of a new pkexec."""
+        helper = len(cmd) > 1 and cmd[1] == HELPER_PATH
+        run_cmd = cmd[:2] + ["--events"] + self._helper_options() + cmd[2:] if helper else cmd
+        events = []
+
+        def handle_event(ev):
+            events.append(ev)
+            kind = ev["event"]
+            if kind == "apt-error" and ev.get("class") in _APT_ERROR_HINTS:
+                self._append_log(f"⚠  {_APT_ERROR_HINTS[ev['class']]}\n")
+            elif kind == "lock-wait":
+                m = re.search(r"held by process (\d+) \(([^)]*)\)", ev.get("message", ""))
+                who = f"{m.group(2)} (pid {m.group(1)})" if m else "another package manager"
+                self._dispatch.call(self.status_push,
+                                    f"{self._busy_text} waiting for {who} to release the dpkg lock…")
+            elif kind == "step-end":
+                self._append_log(f"[{ev.get('step')}: {ev.get('duration_ms', 0) / 1000:.1f} s, "
+                                 f"exit {ev.get('rc')}]\n")
+            if on_event is not None:
+                self._dispatch.call(on_event, ev)
+
+        def read_events(stream):
+            for line in stream:
+                ev = parse_helper_event(line)
+                if ev is None:
+                    self._append_log(line)
+                else:
+                    handle_event(ev)
+
         def worker():
             combined = []
+            # Command and exit-status lines are what LogIndex reads a
+            # session's packages and outcome from.
+            shown = cmd[1:] if cmd and cmd[0] == "pkexec" else cmd
+            self._append_log(f"$ {' '.join(os.path.basename(c) if i == 0 else c for i, c in enumerate(shown))}\n")
+            progress = AptProgress()
+            last_progress = [None]
+            self._last_activity = time.monotonic()
+
+            def handle_line(line):
+                self._last_activity = time.monotonic()
+                if progress.feed(line):
+                    # Status records drive the bar, not the log — except
+                    # dpkg errors, which are worth keeping.
+                    if line.startswith("pmerror:"):
+                        combined.append(line)
+                        self._append_log(f"E: {progress.errors[-1]}\n")
+                    key = (progress.phase, progress.package, int(progress.fraction * 100))
+                    if key != last_progress[0]:
+                        last_progress[0] = key
+                        self._dispatch.call(self._on_apt_progress, progress.fraction,
+                                            progress.describe())
+                    return
+                combined.append(line)
+                self._append_log(line)
+
             try:
-                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                        text=True, bufsize=1)
-                for line in proc.stdout:
-                    combined.append(line)
-                    self._dispatch.call(self._append_log, line)
-                rc = proc.wait()
+                if helper and self._helper_session is not None:
+                    rc = self._helper_session.request(cmd[2:], handle_line, handle_event)
+                else:
+                    proc = subprocess.Popen(run_cmd, stdout=subprocess.PIPE,
+                                            stderr=subprocess.PIPE if helper else subprocess.STDOUT,
+                                            text=True, bufsize=1)
+                    reader = None
+                    if helper:
+                        reader = threading.Thread(target=read_events, args=(proc.stderr,), daemon=True)
+                        reader.start()
+                    for line in proc.stdout:
+                        handle_line(line)
+                    rc = proc.wait()
+                    if reader is not None:
+                        reader.join()
             except Exception as e:
                 rc = 1
                 combined.append(f"\nERROR: {e}\n")
-                self._dispatch.call(self._append_log, combined[-1])
+                self._append_log(combined[-1])
+            self._append_log(f"[exit status {rc}]\n")
 
             output = "".join(combined)
 
@@ -2389,13 +4719,14 @@ class KernelManager:
             # subcommand names don't necessarily contain "apt".
             _APT_BACKED_SUBCOMMANDS = {
                 "install", "remove", "update-sources", "hold", "unhold",
-                "add-repo-liquorix", "add-repo-xanmod",
+                "add-repo-liquorix", "add-repo-xanmod", "plan",
             }
             is_apt_cmd = len(cmd) > 2 and cmd[2] in _APT_BACKED_SUBCOMMANDS
-            if rc == 100 and is_apt_cmd:
-                self._dispatch.call(self._append_log,
-                              "\n⚠  apt exited with code 100 — package not found or "
-                              "dependency conflict. Check the log above.\n")
+            # The helper already classified the failure if it could.
+            classified = any(ev["event"] == "apt-error" for ev in events)
+            if rc == 100 and is_apt_cmd and not classified:
+                self._append_log("\n⚠  apt exited with code 100 — package not found or "
+                                 "dependency conflict. Check the log above.\n")
 
             # Track consecutive pkexec authentication failures so we can show
             # the warning banner after a threshold is reached.
@@ -2453,21 +4784,14 @@ class KernelManager:
     def _get_selected_packages(self, only_installed=None):
         pkgs = []
         bad = []
-        for rows in (self.rows_xanmod, self.rows_liquorix, self.rows_meta):
-            for row in rows:
-                if row.is_selected and (only_installed is None or row.is_installed == only_installed):
-                    try:
-                        pkgs.append(self._sanitize_pkg_name(row.name))
-                    except ValueError as e:
-                        bad.append(str(e))
-        # Also collect from mainline groups
-        for rows in self._mainline_groups.values():
-            for row in rows:
-                if row.is_selected and (only_installed is None or row.is_installed == only_installed):
-                    try:
-                        pkgs.append(self._sanitize_pkg_name(row.name))
-                    except ValueError as e:
-                        bad.append(str(e))
+        mask = -1
+        if only_installed is not None:
+            mask = self._index.mask("status", "installed" if only_installed else "available")
+        for row in self._selection.rows(mask):
+            try:
+                pkgs.append(self._sanitize_pkg_name(row.name))
+            except ValueError as e:
+                bad.append(str(e))
         if bad:
             self._dispatch.call(self._error_dialog, "Invalid package name(s)",
                           "The following package names were rejected:\n" + "\n".join(bad))
@@ -2478,25 +4802,8 @@ class KernelManager:
         if not pkgs:
             self._error_dialog("Nothing selected", "Select kernels to install.")
             return
-        self._pre_modules = set(os.listdir("/usr/lib/modules")) if os.path.isdir("/usr/lib/modules") else set()
-        self.btn_details.setChecked(True)
-        self._clear_log()
-        self._start_log_session("install")
-        self._set_busy(True, "Installing kernels…")
-        self._stream_subprocess(["pkexec", HELPER_PATH, "install"] + pkgs, self._on_install_done)
-
-    def _on_install_done(self, rc, _):
-        ok = rc == 0
-        self._set_busy(False, "Installation complete." if ok else "Installation failed.")
-        if not ok:
-            self._error_dialog("Install failed", "See the Details log for more information.")
-            self._end_log_session()
-            return
-        if self.chk_auto_rm.isChecked():
-            self._auto_remove_old_kernels()
-        self._run_update_grub_silent()
-        self._dkms_for_new_kernels_then_reboot()
-        self._reload_kernels_async()
+        pkgs = self._pair_nvidia_modules(pkgs)
+        self._submit(QueuedJob("install", pkgs))
 
     def _install_and_hold_selected(self, *_):
         """
@@ -2509,41 +4816,213 @@ class KernelManager:
         if not pkgs:
             self._error_dialog("Nothing selected", "Select kernels to install and hold.")
             return
+        pkgs = self._pair_nvidia_modules(pkgs)
+        self._submit(QueuedJob("install", pkgs, hold=pkgs, session="install-hold"))
+
+    def _run_install_plan(self, pkgs, hold, preflight=None, remove=None, purge=False):
+        """Install pkgs (holding those in `hold`), remove old kernels, update
+        GRUB and rebuild DKMS modules for the kernels the install added —
+        one helper plan, so one authentication for the whole chain. With
+        DKMS modules registered and headers among pkgs, the plan first
+        test-builds them against the new headers (dkms_preflight) and stops
+        there if that fails.
+
+        remove=None asks about auto-removing old kernels (if enabled) up
+        front, so the removal runs in the same plan — before GRUB, DKMS and
+        the reboot prompt — instead of after the user was told to reboot."""
+        if remove is None:
+            remove = []
+            if self.chk_auto_rm.isChecked():
+                old = [p for p in self._old_kernel_packages() if p not in pkgs]
+                response = self._ask_auto_remove(old, after_install=True) if old else None
+                if response:
+                    remove, purge = old, response == "purge"
+        if preflight is None:
+            preflight = (load_config()["dkms_preflight"] and _dkms_modules_registered()
+                         and any(p.startswith("linux-headers-") for p in pkgs))
+        args = (["--preflight"] if preflight else []) + ["--install"] + pkgs
+        if hold:
+            args += ["--hold"] + hold
+        if remove:
+            args += ["--purge" if purge else "--remove"] + remove
+        args += ["--grub", "--dkms-new"]
+        self._set_busy(True, "Installing kernels…")
+        self._run_plan(args, lambda rc, results: self._on_install_plan_done(
+            pkgs, hold, remove, purge, rc, results))
+
+    def _on_install_plan_done(self, pkgs, hold, remove, purge, rc, results):
+        if results.get("preflight", 0) != 0:
+            self._on_preflight_failed(pkgs, hold, remove, purge)
+            return
+        if results.get("install") != 0:
+            self._set_busy(False, "Installation failed.")
+            self._error_dialog("Install failed", "See the Details log for more information.")
+            self._end_log_session()
+            return
+        if hold and results.get("hold") != 0:
+            self._set_busy(False, "Hold failed after install.")
+            self._error_dialog("Hold failed",
+                               "Packages were installed but hold could not be applied.\n"
+                               "Run 'sudo apt-mark hold " + " ".join(hold) + "' manually.")
+        elif hold:
+            self._show_toast(f"Installed and held: {', '.join(hold)}")
+        self._reload_kernels_async()
+        if rc != 0 and "dkms" not in results:
+            # The plan stopped before DKMS ran (hold, remove or update-grub failed).
+            self._set_busy(False, "Installed — some follow-up steps failed, see log.")
+            self._end_log_session()
+        else:
+            self._on_dkms_done(results.get("dkms", 0), "")
+
+    # ── Operation queue ───────────────────────────────────────────────────────
+
+    def _submit(self, job):
+        """Start job now, or queue it behind the running operation."""
+        if not self.busy and not self._queue:
+            self._start_job(job)
+            return
+        merged = self._queue.add(job)
+        self._update_queue_view()
+        self._show_toast(f"Queued: {job.label()} package(s)" + (" (merged)" if merged else ""))
+
+    def _start_job(self, job):
+        """Run job once no other package manager holds the dpkg lock,
+        checking again with backoff (1 s, 2 s, 4 s … 15 s) for up to
+        dpkg_lock_timeout_secs meanwhile."""
+        holder = dpkg_lock_holder()
+        if holder is None:
+            self._run_job(job)
+            return
+        timeout = load_config()["dpkg_lock_timeout_secs"]
+        started = time.monotonic()
+        delay = [1.0]
+
+        def check():
+            holder = dpkg_lock_holder()
+            if holder is None:
+                self._run_job(job)
+                return
+            self._last_activity = time.monotonic()  # waiting, not stalled
+            waited = time.monotonic() - started
+            if waited >= timeout:
+                dropped = len(self._queue)
+                self._queue.clear()
+                self._update_queue_view()
+                self._set_busy(False, "Package manager busy — operation not started.")
+                self._error_dialog(
+                    "Package manager busy",
+                    f"{self._describe_lock_holder(holder)} has held the package manager lock "
+                    f"for more than {_format_duration(timeout)}, so “{job.label()} package(s)” "
+                    "was not started."
+                    + (f"\n\n{dropped} queued operation(s) were dropped as well." if dropped else "")
+                    + "\n\nTry again once it has finished."
+                )
+                return
+            self._set_busy(True, f"Waiting for {self._describe_lock_holder(holder)} to release the "
+                                 f"package manager lock — {_format_duration(waited)}…")
+            QTimer.singleShot(int(delay[0] * 1000), check)
+            delay[0] = min(delay[0] * 2, 15.0)
 
-        self._pre_modules = set(os.listdir("/usr/lib/modules")) if os.path.isdir("/usr/lib/modules") else set()
+        check()
+
+    @staticmethod
+    def _describe_lock_holder(holder):
+        running = holder["running_secs"]
+        return (f"{holder['name']} (pid {holder['pid']}"
+                + (f", running {_format_duration(running)}" if running is not None else "") + ")")
+
+    def _run_job(self, job):
         self.btn_details.setChecked(True)
         self._clear_log()
-        self._start_log_session("install-hold")
-        self._set_busy(True, "Installing kernels…")
+        self._start_log_session(job.session)
+        if job.kind == "install":
+            self._run_install_plan(job.pkgs, hold=job.hold)
+        elif job.kind == "remove":
+            self._run_remove_plan(job.pkgs, purge=job.purge)
+        else:
+            self._set_busy(True, "Applying hold…" if job.kind == "hold" else "Releasing hold…")
+            self._stream_subprocess(
+                ["pkexec", HELPER_PATH, job.kind] + job.pkgs,
+                self._make_hold_done_cb(job.pkgs, job.kind)
+            )
 
-        def on_install_done(rc, _):
-            if rc != 0:
-                self._set_busy(False, "Installation failed.")
-                self._error_dialog("Install failed", "See the Details log for more information.")
-                self._end_log_session()
-                return
-            # Installation succeeded — now apply hold
-            self._set_busy(True, f"Applying hold to {len(pkgs)} package(s)…")
-            self._append_log(f"\n=== Applying apt-mark hold to {len(pkgs)} package(s) ===\n")
-
-            def on_hold_done(rc2, _):
-                ok = rc2 == 0
-                self._set_busy(False, "Install + Hold complete." if ok else "Hold failed after install.")
-                if ok:
-                    self._show_toast(f"Installed and held: {', '.join(pkgs)}")
-                else:
-                    self._error_dialog("Hold failed",
-                                       "Packages were installed but hold could not be applied.\n"
-                                       "Run 'sudo apt-mark hold " + " ".join(pkgs) + "' manually.")
-                if self.chk_auto_rm.isChecked():
-                    self._auto_remove_old_kernels()
-                self._run_update_grub_silent()
-                self._dkms_for_new_kernels_then_reboot()
-                self._reload_kernels_async()
+    def _run_next_job(self):
+        if self.busy or not self._queue:
+            return
+        job = self._queue.pop()
+        self._update_queue_view()
+        self._start_job(job)
+
+    def _clear_queue(self):
+        self._queue.clear()
+        self._update_queue_view()
+
+    def _update_queue_view(self):
+        jobs = self._queue.jobs
+        self.queue_label.setVisible(bool(jobs))
+        self.btn_clear_queue.setVisible(bool(jobs))
+        if jobs:
+            self.queue_label.setText("Queued: " + " → ".join(j.label() for j in jobs))
+            self.queue_label.setToolTip("\n".join(
+                f"{j.label()}: {', '.join(j.pkgs)}" for j in jobs
+            ))
+
+    def _on_preflight_failed(self, pkgs, hold, remove, purge):
+        failed = [f"{ev['module']} for {ev['kernel']}" for ev in self._plan_events
+                  if ev["event"] == "preflight-module" and not ev.get("ok")]
+        self._set_busy(False, "DKMS preflight failed — nothing was installed.")
+        box = QMessageBox(self.win)
+        box.setWindowTitle("DKMS Modules Won't Build")
+        box.setText(
+            "These DKMS modules failed to build against the new kernel's headers:\n\n"
+            + "\n".join(failed[:10]) + ("\n…" if len(failed) > 10 else "")
+            + "\n\nNothing has been installed yet. If you install anyway, the new "
+              "kernel will boot without these drivers (e.g. NVIDIA, ZFS)."
+            if failed else
+            "The DKMS compatibility check could not be completed (see the Details "
+            "log). Nothing has been installed yet."
+        )
+        btn_cancel = box.addButton("Cancel Install", QMessageBox.ButtonRole.RejectRole)
+        btn_anyway = box.addButton("Install Anyway", QMessageBox.ButtonRole.DestructiveRole)
+        box.exec()
+        if box.clickedButton() is btn_anyway:
+            self._append_log("\n=== Installing despite the DKMS preflight result ===\n")
+            self._run_install_plan(pkgs, hold, preflight=False, remove=remove, purge=purge)
+        else:
+            self._end_log_session()
+
+    # ── Privileged plans ──────────────────────────────────────────────────────
+
+    _PLAN_STEP_TEXT = {
+        "install": "Installing kernels…",
+        "hold": "Applying hold…",
+        "remove": "Removing kernels…",
+        "update-grub": "Updating GRUB…",
+        "dkms": "Rebuilding DKMS modules…",
+        "preflight": "Test-building DKMS modules against the new headers…",
+    }
 
-            self._stream_subprocess(["pkexec", HELPER_PATH, "hold"] + pkgs, on_hold_done)
+    def _run_plan(self, plan_args, on_done):
+        """
+        Run several helper steps in one privileged session
+        ("xkm-helper plan …", one pkexec prompt). The helper stops at the
+        first failing step; on_done(rc, results) gets {step: rc} for the
+        steps that ran, and the plan's events stay in self._plan_events.
+        """
+        self._plan_events = []
+
+        def on_event(ev):
+            self._plan_events.append(ev)
+            if ev["event"] == "step-start" and self.busy:
+                self._set_busy(True, self._PLAN_STEP_TEXT.get(ev["step"], "Working…"))
+            elif ev["event"] == "grub-sync" and ev.get("action") == "skipped" and self.busy:
+                self._set_busy(True, "GRUB menu already up to date — skipped update-grub.")
 
-        self._stream_subprocess(["pkexec", HELPER_PATH, "install"] + pkgs, on_install_done)
+        def finished(rc, _output):
+            results = {ev["step"]: ev["rc"] for ev in self._plan_events if ev["event"] == "step-end"}
+            on_done(rc, results)
+
+        self._stream_subprocess(["pkexec", HELPER_PATH, "plan"] + plan_args, finished, on_event=on_event)
 
     # ── Hold / Unhold ─────────────────────────────────────────────────────────
 
@@ -2552,14 +5031,7 @@ class KernelManager:
         if not pkgs:
             self._error_dialog("Nothing to hold", "Select installed kernels to hold.")
             return
-        self.btn_details.setChecked(True)
-        self._clear_log()
-        self._start_log_session("hold")
-        self._set_busy(True, "Applying hold…")
-        self._stream_subprocess(
-            ["pkexec", HELPER_PATH, "hold"] + pkgs,
-            self._make_hold_done_cb(pkgs, "hold")
-        )
+        self._submit(QueuedJob("hold", pkgs))
 
     def _make_hold_done_cb(self, pkgs, action):
         """Return a named callback for hold/unhold completion (avoids tuple-lambda pattern)."""
@@ -2580,54 +5052,12 @@ class KernelManager:
         if not pkgs:
             self._error_dialog("Nothing to unhold", "Select held kernels to release.")
             return
-        self.btn_details.setChecked(True)
-        self._clear_log()
-        self._start_log_session("unhold")
-        self._set_busy(True, "Releasing hold…")
-        self._stream_subprocess(
-            ["pkexec", HELPER_PATH, "unhold"] + pkgs,
-            self._make_hold_done_cb(pkgs, "unhold")
-        )
-
-    # ── update-grub safety net ────────────────────────────────────────────────
-
-    def _run_update_grub_silent(self, on_complete=None):
-        """
-        Run update-grub after install or remove as a safety net.
-        Kernel postinst scripts normally handle this, but running it explicitly
-        ensures the bootloader is consistent when packages are removed manually
-        or when GRUB has been customised.  Output is appended to the current log
-        session.  If `on_complete` is provided it is called after grub finishes,
-        allowing callers to close the log session once all output is captured.
-        """
-        self._append_log("\n=== Running update-grub (safety net) ===\n")
-
-        def on_done(rc, _):
-            self._append_log(
-                "✓ update-grub completed.\n" if rc == 0
-                else "⚠ update-grub returned a non-zero exit code — check log.\n"
-            )
-            if on_complete:
-                on_complete()
-
-        self._stream_subprocess(["pkexec", HELPER_PATH, "update-grub"], on_done)
+        self._submit(QueuedJob("unhold", pkgs))
 
     def _remove_selected(self, *_):
-        # Pass 1: flat XanMod / Liquorix / Meta rows.
-        # Pass 2: mainline groups (separate data structure, not a flat list).
-        # Both passes run before any early-return so the guard fires exactly
-        # once, regardless of which tab holds the active kernel's packages.
-        all_selected_rows = []
-        for rows in (self.rows_xanmod, self.rows_liquorix, self.rows_meta):
-            for row in rows:
-                if row.is_selected:
-                    all_selected_rows.append(row)
-        for rows in self._mainline_groups.values():
-            for row in rows:
-                if row.is_selected:
-                    all_selected_rows.append(row)
-
-        if any(r.is_active for r in all_selected_rows):
+        # The selection spans every tab, so this guard fires regardless of
+        # which tab holds the active kernel's packages.
+        if self._selection.counts["active"]:
             self._error_dialog("Cannot Remove Active Kernel",
                                "The currently running kernel cannot be removed.")
             return
@@ -2658,40 +5088,30 @@ class KernelManager:
         # (e.g. linux-firmware, linux-base) that other kernels still need,
         # which is surprising and hard to undo. Users who want dependency
         # cleanup can run `apt autoremove` manually afterward.
-        apt_flag = "--purge" if response == "purge" else None
-        cmd = ["pkexec", HELPER_PATH, "remove"]
-        if apt_flag:
-            cmd.append(apt_flag)
-        cmd += pkgs
-        self.btn_details.setChecked(True)
-        self._clear_log()
-        self._start_log_session(response)
-        self._set_busy(True, f"{'Purging' if response == 'purge' else 'Removing'} kernels…")
-        self._stream_subprocess(cmd, self._on_remove_done)
-
-    def _on_remove_done(self, rc, _):
-        self._set_busy(False, "Done." if rc == 0 else "Remove failed.")
-        if rc == 0:
-            # Run update-grub first so its output lands inside this log session,
-            # then formally close the session once grub is done.
-            self._run_update_grub_silent(on_complete=self._end_log_session)
-        else:
+        self._submit(QueuedJob("remove", pkgs, purge=response == "purge", session=response))
+
+    def _run_remove_plan(self, pkgs, purge):
+        """Remove (or purge) pkgs and then sync the bootloader as a safety
+        net — kernel postrm scripts normally handle it, so the helper only
+        runs update-grub if grub.cfg still doesn't match /boot or the GRUB
+        settings changed (grub_sync in xkm-helper)."""
+        self._set_busy(True, f"{'Purging' if purge else 'Removing'} kernels…")
+        self._run_plan(["--purge" if purge else "--remove"] + pkgs + ["--grub"], self._on_remove_done)
+
+    def _on_remove_done(self, rc, results):
+        removed = results.get("remove") == 0
+        self._set_busy(False, "Done." if rc == 0 else "Removed — update-grub failed, see log."
+                       if removed else "Remove failed.")
+        if not removed:
             self._error_dialog("Remove failed", "See the Details log for more information.")
-            self._end_log_session()  # always close on failure too
+        self._end_log_session()
         self._reload_kernels_async()
 
-    def _auto_remove_old_kernels(self, *_):
-        installed_rows = []
-        for rows in (self.rows_xanmod, self.rows_liquorix, self.rows_meta):
-            for r in rows:
-                if r.is_installed:
-                    installed_rows.append(r)
-        for rows in self._mainline_groups.values():
-            for r in rows:
-                if r.is_installed:
-                    installed_rows.append(r)
-        if not installed_rows:
-            return
+    def _old_kernel_packages(self):
+        """Installed packages auto-remove would take out: everything except
+        the running kernel, the two newest installed versions and anything
+        held."""
+        installed_rows = self._index.rows_in(self._index.mask("status", "installed"))
         versions = {}
         for row in installed_rows:
             versions.setdefault(row.version, []).append(row)
@@ -2699,75 +5119,61 @@ class KernelManager:
         active = next((r.version for r in installed_rows if r.is_active), None)
         keep = {active} if active else set()
         keep.update(ver_list[:2])
-        to_remove = [r.name for v in versions if v not in keep for r in versions[v]
-                     if not r.is_held]  # never auto-remove held packages
-        if not to_remove:
-            self._show_toast("Nothing to auto-remove.")
-            return
+        return [r.name for v in versions if v not in keep for r in versions[v]
+                if not r.is_held]  # never auto-remove held packages
 
+    def _ask_auto_remove(self, to_remove, after_install=False):
+        """"remove", "purge" or None (cancelled) for auto-removing to_remove."""
         box = QMessageBox(self.win)
         box.setWindowTitle("Auto-Remove Old Kernels")
         box.setText(
-            f"Found {len(to_remove)} package(s) to remove.\n\n"
+            f"Found {len(to_remove)} package(s) to remove"
+            + (" once the new kernel is installed" if after_install else "") + ".\n\n"
             "Remove: keep config files.\n"
             "Purge: also delete config files."
         )
-        btn_cancel = box.addButton("Cancel", QMessageBox.ButtonRole.RejectRole)
+        btn_cancel = box.addButton("Keep Them" if after_install else "Cancel",
+                                   QMessageBox.ButtonRole.RejectRole)
         btn_remove = box.addButton("Remove", QMessageBox.ButtonRole.AcceptRole)
         btn_purge  = box.addButton("Purge", QMessageBox.ButtonRole.DestructiveRole)
         box.exec()
         clicked = box.clickedButton()
-        response = "remove" if clicked is btn_remove else "purge" if clicked is btn_purge else "cancel"
-        if response not in ("remove", "purge"):
+        return "remove" if clicked is btn_remove else "purge" if clicked is btn_purge else None
+
+    def _auto_remove_old_kernels(self, *_):
+        to_remove = self._old_kernel_packages()
+        if not to_remove:
+            self._show_toast("Nothing to auto-remove.")
+            return
+        response = self._ask_auto_remove(to_remove)
+        if response is None:
             return
 
         # Same reasoning as _remove_selected: avoid --auto-remove cascade.
-        apt_flag = "--purge" if response == "purge" else None
-        cmd = ["pkexec", HELPER_PATH, "remove"]
-        if apt_flag:
-            cmd.append(apt_flag)
-        cmd += to_remove
-        self.btn_details.setChecked(True)
-        self._clear_log()
-        self._start_log_session(f"autoremove-{response}")
-        self._set_busy(True, "Auto-removing old kernels…")
-        self._stream_subprocess(cmd, self._on_remove_done)
+        self._submit(QueuedJob("remove", to_remove, purge=response == "purge",
+                               session=f"autoremove-{response}"))
 
     # ── Improved DKMS Logic ───────────────────────────────────────────────────
-
-    def _dkms_for_new_kernels_then_reboot(self):
-        """
-        Robust DKMS rebuild:
-          1. Detect newly installed kernel module directories.
-          2. For each new kernel version, run `dkms autoinstall`.
-          3. After completion, verify each module was built successfully.
-          4. Report any failures before prompting for reboot.
-        """
-        after = set(os.listdir("/usr/lib/modules")) if os.path.isdir("/usr/lib/modules") else set()
-        new_kernels = [k for k in (after - self._pre_modules) if k != self.running_release]
-
-        if not new_kernels:
-            self._show_reboot_dialog()
-            self._end_log_session()
-            return
-
-        self._set_busy(True, f"Rebuilding DKMS modules for {len(new_kernels)} kernel(s)…")
-        self._append_log(f"\n=== DKMS: Processing {len(new_kernels)} new kernel(s) ===\n")
-        for k in new_kernels:
-            self._append_log(f"  → {k}\n")
-
-        # The autoinstall-then-verify logic lives in xkm-helper's
-        # "dkms-autoinstall" subcommand now, so we just hand it the list of
-        # newly installed kernel versions as arguments (each validated
-        # helper-side against a strict version-token pattern).
-        self._stream_subprocess(
-            ["pkexec", HELPER_PATH, "dkms-autoinstall"] + new_kernels,
-            self._on_dkms_done
-        )
+    # The autoinstall-then-verify logic lives in xkm-helper and runs as the
+    # last step of the install plan; this reports what it found.
 
     def _on_dkms_done(self, rc, output):
         self._set_busy(False)
-        if rc != 0:
+        for ev in self._plan_events:
+            if ev["event"] == "dkms-ccache":
+                total = ev["hits"] + ev["misses"]
+                self.status_push(f"DKMS modules rebuilt — ccache: {ev['hits']} of {total} "
+                                 f"compile(s) from cache")
+        problems = [
+            f"{ev['module']} on {ev['kernel']}: {ev['state']}"
+            for ev in self._plan_events
+            if ev["event"] == "dkms-module" and ev.get("state") not in ("installed", "built")
+        ] + [
+            f"dkms autoinstall failed for {ev['kernel']}"
+            for ev in self._plan_events
+            if ev["event"] == "dkms-kernel" and not ev.get("ok")
+        ]
+        if rc != 0 or problems:
             # Show warning but still offer reboot — kernel is installed even if DKMS had issues
             box = QMessageBox(self.win)
             box.setWindowTitle("DKMS Warning")
@@ -2777,6 +5183,8 @@ class KernelManager:
                 "The new kernel was installed — you can still reboot, but some "
                 "driver modules (e.g. NVIDIA) may not be available until DKMS is fixed."
             )
+            if problems:
+                box.setInformativeText("\n".join(problems[:8] + (["…"] if len(problems) > 8 else [])))
             btn_log = box.addButton("Stay & Review Log", QMessageBox.ButtonRole.RejectRole)
             btn_reboot = box.addButton("Reboot Anyway", QMessageBox.ButtonRole.DestructiveRole)
             box.exec()
@@ -2799,26 +5207,17 @@ class KernelManager:
     # ── Button State ──────────────────────────────────────────────────────────
 
     def _update_buttons(self):
-        can_install = can_remove = can_hold = can_unhold = False
-        for rows in (self.rows_xanmod, self.rows_liquorix, self.rows_meta):
-            for row in rows:
-                if row.is_selected:
-                    if not row.is_installed:                    can_install = True
-                    if row.is_installed and not row.is_active:  can_remove  = True
-                    if row.is_installed and not row.is_held:    can_hold    = True
-                    if row.is_installed and row.is_held:        can_unhold  = True
-        for rows in self._mainline_groups.values():
-            for row in rows:
-                if row.is_selected:
-                    if not row.is_installed:                    can_install = True
-                    if row.is_installed and not row.is_active:  can_remove  = True
-                    if row.is_installed and not row.is_held:    can_hold    = True
-                    if row.is_installed and row.is_held:        can_unhold  = True
-        self.btn_install.setEnabled(can_install  and not self.busy)
-        self.btn_install_hold.setEnabled(can_install and not self.busy)
-        self.btn_remove.setEnabled(can_remove   and not self.busy)
-        self.btn_hold.setEnabled(can_hold      and not self.busy)
-        self.btn_unhold.setEnabled(can_unhold    and not self.busy)
+        counts = self._selection.counts
+        can_install = counts["available"] > 0
+        can_remove  = counts["removable"] > 0
+        can_hold    = counts["holdable"]  > 0
+        can_unhold  = counts["held"]      > 0
+        # Package actions stay available while busy; they queue (_submit).
+        self.btn_install.setEnabled(can_install)
+        self.btn_install_hold.setEnabled(can_install)
+        self.btn_remove.setEnabled(can_remove)
+        self.btn_hold.setEnabled(can_hold)
+        self.btn_unhold.setEnabled(can_unhold)
         self.btn_refresh.setEnabled(not self.busy)
         self.btn_autorm.setEnabled(not self.busy)
 
@@ -2884,43 +5283,79 @@ class KernelManager:
         cfg = load_config()
         cfg["dark_mode"] = dark
         save_config(cfg)
-        self.win.apply_color_scheme()
-        self.status_push(f"Switched to {'Dark' if dark else 'Light'} mode")
+        ms = self.win.apply_color_scheme(dark)
+        self.status_push(f"Switched to {'Dark' if dark else 'Light'} mode ({ms:.0f} ms)")
 
     def status_push(self, msg):
         self.status_label.setText(msg)
 
     def _append_log(self, text):
-        self.textedit.moveCursor(QTextCursor.MoveOperation.End)
-        self.textedit.insertPlainText(text)
-        self.textedit.ensureCursorVisible()
-        if self._log_handle:
-            try:
-                self._log_handle.write(text)
-                self._log_handle.flush()
-            except: pass
+        """Queue text for the Details view and session log. Safe to call
+        from worker threads (see LogSink)."""
+        self._log.write(text)
+
+    def _show_log_history(self, *_):
+        """One LogBrowserDialog for the window's lifetime, re-indexed on
+        each open, rather than a new (never freed) dialog per click."""
+        if self._log_browser is None:
+            self._log_browser = LogBrowserDialog(self.win, LOG_DIR)
+        else:
+            self._log_browser.reindex()
+        self._log_browser.exec()
 
     def _start_log_session(self, prefix):
         LOG_DIR.mkdir(parents=True, exist_ok=True)
         ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         fp = LOG_DIR / f"{prefix}_{ts}.log"
-        self._log_handle = open(fp, "w", encoding="utf-8")
+        self._log.flush()  # anything from before belongs to no session
+        self._log.writer.open(fp)
+        self._log_session = fp
         self._append_log(f"\n=== Log started: {fp} ===\n")
 
     def _end_log_session(self):
-        if self._log_handle:
+        if self._log_session is not None:
             self._append_log("\n=== Log ended ===\n")
-            self._log_handle.close()
-        self._log_handle = None
+            self._log.flush()
+            self._log.writer.close()
+        self._log_session = None
+        # Every operation ends here, after its dialogs — the next queued
+        # job starts once this one is fully done.
+        if self._queue:
+            QTimer.singleShot(0, self._run_next_job)
 
     def _clear_log(self):
-        self.textedit.clear()
+        self._log.clear()
 
     def _set_busy(self, busy, text=""):
         self.busy = busy
+        self._busy_text = text or "Working…"
+        # Indeterminate until an operation reports real progress.
+        self.spinner.setRange(0, 0)
         self.spinner.setVisible(busy)
+        self._last_activity = time.monotonic()
+        if busy:
+            self._stall_timer.start()
+        else:
+            self._stall_timer.stop()
         self.status_push(text if text else ("Working…" if busy else "Ready"))
         self._update_buttons()
+        # Operations without a log session (refresh, repository setup) end
+        # here rather than in _end_log_session.
+        if not busy and self._queue and self._log_session is None:
+            QTimer.singleShot(0, self._run_next_job)
+
+    def _on_apt_progress(self, fraction, detail):
+        if not self.busy:
+            return
+        self.spinner.setRange(0, 1000)
+        self.spinner.setValue(int(fraction * 1000))
+        self.status_push(f"{self._busy_text} {detail}")
+
+    def _check_stalled(self):
+        idle = time.monotonic() - self._last_activity
+        if self.busy and idle >= APT_STALL_SECS:
+            self.status_push(f"{self._busy_text} no progress for {_format_duration(idle)} — "
+                             "see Details for the last output")
 
     def _open_cache(self):
         """Open (or re-open) the apt cache with proper error recovery."""
@@ -3081,8 +5516,480 @@ def _run_tests():
             # Should not raise
             self.assertFalse(self._newer("", "2.0.0"))
 
+    def _row(name, version="", installed=False, active=False, held=False):
+        """A KernelRow classified the same way _collect_kernels does it."""
+        if is_xanmod_name(name):
+            family = "xanmod"
+        elif is_liquorix_name(name):
+            family = "liquorix"
+        elif is_mainline_meta(name):
+            family = "meta"
+        else:
+            family = "mainline"
+        mainline = family == "mainline"
+        return KernelRow(
+            name=name, version=version, is_installed=installed,
+            is_active=active, is_held=held,
+            kver=extract_kernel_version(name) if mainline else "",
+            category=pkg_category(name) if mainline else "",
+            flavor=xanmod_flavor(name) if family == "xanmod" else "",
+            flavor_label=extract_kernel_flavor(name) if family in ("meta", "mainline") else "",
+            family=family,
+        )
+
+    class TestFacetIndex(unittest.TestCase):
+
+        def setUp(self):
+            self.rows = [
+                _row("linux-image-6.14.0-37-generic", installed=True, active=True),
+                _row("linux-headers-6.14.0-37-generic", installed=True, held=True),
+                _row("linux-image-6.14.0-37-lowlatency"),
+                _row("linux-image-6.18.3-x64v3-xanmod1"),
+                _row("linux-image-6.18.3-x64v2-xanmod1", installed=True),
+                _row("linux-oem-24.04"),
+            ]
+            self.idx = FacetIndex(self.rows)
+
+        def test_row_ids_follow_input_order(self):
+            self.assertEqual([r.row_id for r in self.rows], list(range(len(self.rows))))
+
+        def test_intersection(self):
+            idx = self.idx
+            m = idx.mask("flavor", "Generic") & idx.mask("status", "installed") & idx.mask("held", "no")
+            self.assertEqual([r.name for r in idx.rows_in(m)], ["linux-image-6.14.0-37-generic"])
+
+        def test_active_is_also_installed(self):
+            self.assertEqual(self.idx.mask("status", "active") & ~self.idx.mask("status", "installed"), 0)
+
+        def test_psabi_only_on_xanmod(self):
+            rows = self.idx.rows_in(self.idx.mask("psabi", "v3"))
+            self.assertEqual([r.name for r in rows], ["linux-image-6.18.3-x64v3-xanmod1"])
+
+        def test_mask_any_and_unknown_value(self):
+            idx = self.idx
+            self.assertEqual(len(idx.rows_in(idx.mask_any("family", ("meta", "xanmod")))), 3)
+            self.assertEqual(idx.mask("flavor", "No Such Flavor"), 0)
+
+    class TestSelectionModel(unittest.TestCase):
+
+        def setUp(self):
+            self.rows = [
+                _row("linux-image-6.14.0-37-generic", installed=True, active=True),
+                _row("linux-image-6.14.0-36-generic", installed=True, held=True),
+                _row("linux-headers-6.14.0-36-generic", installed=True),
+                _row("linux-image-6.15.0-5-generic"),
+                _row("linux-headers-6.15.0-5-generic"),
+            ]
+            self.sel = SelectionModel(FacetIndex(self.rows))
+
+        def test_counters_follow_set(self):
+            sel, rows = self.sel, self.rows
+            sel.set(rows[1], True)
+            sel.set(rows[3], True)
+            self.assertEqual(sel.counts, {"available": 1, "removable": 1, "holdable": 0, "held": 1, "active": 0})
+            self.assertFalse(sel.set(rows[3], True))  # no-op doesn't double count
+            sel.set(rows[1], False)
+            self.assertEqual(sel.counts["removable"], 0)
+            self.assertEqual(sel.rows(), [rows[3]])
+
+        def test_group_targets_prefer_install(self):
+            sel, rows = self.sel, self.rows
+            g = sel.group(FacetIndex.mask_of_rows(rows))
+            self.assertEqual(sel.facets.rows_in(g.target), rows[3:])
+            removal = sel.group(FacetIndex.mask_of_rows(rows[:3]))
+            self.assertEqual(sel.facets.rows_in(removal.target), rows[1:3])  # never the active one
+
+        def test_group_state_and_dirty(self):
+            sel, rows = self.sel, self.rows
+            g = sel.group(FacetIndex.mask_of_rows(rows))
+            sel.set(rows[3], True)
+            self.assertEqual(g.check_state(), Qt.CheckState.PartiallyChecked)
+            self.assertEqual(sel.take_dirty(), [g])
+            sel.set(rows[4], True)
+            self.assertEqual(g.check_state(), Qt.CheckState.Checked)
+            # Registered after the fact: starts from the current selection.
+            self.assertEqual(sel.group(FacetIndex.mask_of_rows(rows[3:4])).selected, 1)
+
+    class TestGroupAggregates(unittest.TestCase):
+
+        def test_stats(self):
+            rows = [
+                _row("linux-image-6.14.0-37-generic", installed=True, active=True),
+                _row("linux-headers-6.14.0-37-generic", installed=True),
+                _row("linux-image-6.14.0-37-lowlatency"),
+                _row("linux-modules-nvidia-550-6.14.0-37-generic"),
+            ]
+            rows[3].gpu_relevant = False
+            for i, r in enumerate(rows):
+                r.size_bytes = 1000 * (i + 1)
+            agg = GroupAggregates(FacetIndex(rows))
+            st = agg.stats_of(rows)
+            self.assertEqual((st.n, st.n_installed, st.n_active, st.n_gpu_hidden), (4, 2, 1, 1))
+            self.assertEqual(st.total_bytes, 10000)
+            self.assertEqual(st.badges, ["Generic", "Low Latency"])
+            self.assertEqual((st.n_install, st.n_remove), (1, 1))
+            self.assertIn("Headers", st.categories)
+            self.assertIs(agg.stats_of(rows), st)  # cached per group
+
+    class TestMainlineWindow(unittest.TestCase):
+
+        def setUp(self):
+            rows = [_row(f"linux-image-6.14.0-{n}-generic", installed=n == 10)
+                    for n in (14, 13, 12, 11, 10)]
+            rows.append(_row("linux-image-6.14.0-12-lowlatency"))
+            self.idx = FacetIndex(rows)
+            self.versions = [f"6.14.0-{n}" for n in (14, 13, 12, 11, 10)]
+            self.flavors = {kv: ("Generic",) for kv in self.versions}
+            self.flavors["6.14.0-12"] = ("Generic", "Low Latency")
+
+        def _window(self, window, flavor_mask=-1, query_mask=-1):
+            shown, older = window_mainline_versions(
+                self.idx, self.versions, self.flavors, flavor_mask, query_mask, window)
+            return [kv for kv, _ in shown], older
+
+        def test_newest_per_flavor_plus_installed(self):
+            # -12 is only the third Generic, but the first Low Latency;
+            # -10 is past the window but installed.
+            self.assertEqual(self._window(2), (["6.14.0-14", "6.14.0-13", "6.14.0-12", "6.14.0-10"], 1))
+
+        def test_show_older_widens_by_a_page(self):
+            self.assertEqual(self._window(2 + 2), (self.versions, 0))
+
+        def test_window_applies_after_filtering(self):
+            generic = self.idx.mask("flavor", "Generic")
+            self.assertEqual(self._window(2, flavor_mask=generic),
+                             (["6.14.0-14", "6.14.0-13", "6.14.0-10"], 2))
+            old = self.idx.mask("kver", "6.14.0-11")
+            self.assertEqual(self._window(2, query_mask=old), (["6.14.0-11"], 0))
+
+    class TestNvidiaModuleMatrix(unittest.TestCase):
+
+        def test_branches_and_pairing(self):
+            rows = [
+                _row("linux-image-6.14.0-37-generic", installed=True, active=True),
+                _row("linux-modules-nvidia-550-6.14.0-37-generic", installed=True),
+                _row("linux-modules-nvidia-570-server-open-6.14.0-37-generic"),
+                _row("linux-modules-nvidia-550-6.14.0-37-lowlatency"),
+                _row("linux-image-6.15.0-12-generic"),
+            ]
+            self.assertEqual(nvidia_module_branch(rows[2].name), "570-server-open")
+            self.assertIsNone(nvidia_module_branch("linux-modules-extra-6.14.0-37-generic"))
+            m = NvidiaModuleMatrix(rows)
+            self.assertEqual(m.branches("6.14.0-37", "Generic"), ["550", "570-server-open"])
+            self.assertEqual(m.installed_branch("6.14.0-37", "Generic"), "550")
+            self.assertIs(m.module_for("6.14.0-37", "Low Latency", "550"), rows[3])
+            self.assertIsNone(m.module_for("6.15.0-12", "Generic", "550"))  # a gap
+
+    class TestLogRetention(unittest.TestCase):
+
+        def setUp(self):
+            import tempfile
+            self._tmp = tempfile.TemporaryDirectory()
+            self.dir = Path(self._tmp.name)
+            self.now = 1_000_000_000.0
+            # install_0 newest ... install_4 oldest, one day apart, 100 bytes each
+            for i in range(5):
+                p = self.dir / f"install_{i}.log.gz"
+                p.write_bytes(b"x" * 100)
+                os.utime(p, (self.now - i * 86400, self.now - i * 86400))
+            (self.dir / "notes.txt").write_text("not a log")
+
+        def tearDown(self):
+            self._tmp.cleanup()
+
+        def _left(self):
+            return sorted(p.name for p in self.dir.iterdir())
+
+        def test_keep_count(self):
+            prune_logs(self.dir, 2, 999, 10**9, now=self.now)
+            self.assertEqual(self._left(), ["install_0.log.gz", "install_1.log.gz", "notes.txt"])
+
+        def test_age_and_size(self):
+            prune_logs(self.dir, 99, 2.5, 10**9, now=self.now)
+            self.assertEqual(len(self._left()), 4)
+            prune_logs(self.dir, 99, 999, 250, now=self.now)
+            self.assertEqual(self._left(), ["install_0.log.gz", "install_1.log.gz", "notes.txt"])
+
+        def test_active_session_excluded(self):
+            active = self.dir / "install_4.log.gz"
+            prune_logs(self.dir, 0, 999, 10**9, exclude=(active,), now=self.now)
+            self.assertEqual(self._left(), ["install_4.log.gz", "notes.txt"])
+
+        def test_startup_leaves_live_sessions_alone(self):
+            # A crashed session's log, and two that another running XKM
+            # could still be writing: one just touched, one held open.
+            old = time.time() - 3600
+            for name in ("crashed", "recent", "open"):
+                (self.dir / f"{name}_2025-01-01_00-00-00.log").write_text(name)
+            for name in ("crashed", "open"):
+                os.utime(self.dir / f"{name}_2025-01-01_00-00-00.log", (old, old))
+            writer = LogWriter(self.dir, {"log_keep_sessions": 99, "log_max_age_days": 10**6})
+            with open(self.dir / "open_2025-01-01_00-00-00.log"):
+                writer._maintain()
+            self.assertEqual([n for n in self._left() if n[0] in "cor"], [
+                "crashed_2025-01-01_00-00-00.log.gz",
+                "open_2025-01-01_00-00-00.log",
+                "recent_2025-01-01_00-00-00.log",
+            ])
+
+    class TestLogIndex(unittest.TestCase):
+
+        def setUp(self):
+            import tempfile
+            self._tmp = tempfile.TemporaryDirectory()
+            self.dir = Path(self._tmp.name)
+            (self.dir / "install_2026-09-01_10-00-00.log").write_text(
+                "$ xkm-helper install linux-image-6.14.0-37-generic\n"
+                "Setting up linux-headers-6.14.0-37-generic (6.14.0-37.37) ...\n"
+                "  ✗ dkms autoinstall reported errors for 6.14.0-37-generic\n"
+                "[exit status 0]\n"
+            )
+            with gzip.open(self.dir / "remove_2026-09-02_11-30-00.log.gz", "wt") as f:
+                f.write("$ xkm-helper remove linux-image-6.8.0-40-generic\n[exit status 0]\n")
+
+        def tearDown(self):
+            self._tmp.cleanup()
+
+        def test_scan_and_search(self):
+            idx = LogIndex(self.dir).refresh()
+            self.assertEqual([e["op"] for e in idx.entries], ["remove", "install"])
+            self.assertEqual(idx.entries[1]["time"], "2026-09-01 10:00:00")
+            self.assertIn("linux-headers-6.14.0-37-generic", idx.entries[1]["packages"])
+            self.assertEqual(idx.entries[1]["errors"][0][0], 2)
+            self.assertEqual([e["op"] for e in idx.search("dkms FAILED")], ["install"])
+            self.assertEqual([e["op"] for e in idx.search("6.8.0 ok")], ["remove"])
+
+        def test_refresh_drops_deleted_logs(self):
+            LogIndex(self.dir).refresh()
+            (self.dir / "remove_2026-09-02_11-30-00.log.gz").unlink()
+            self.assertEqual(len(LogIndex(self.dir).refresh().entries), 1)
+
+        def test_paging(self):
+            p = self.dir / "big_2026-09-03_00-00-00.log"
+            p.write_text("".join(f"line {i}\n" for i in range(5000)))
+            lf = LogFile(p)
+            self.assertEqual(lf.line_count, 5000)
+            self.assertEqual(lf.lines(4998, 10), "line 4998\nline 4999\n")
+            self.assertEqual(lf.lines(10, 2), "line 10\nline 11\n")
+            lf.close()
+
+    class TestAptProgress(unittest.TestCase):
+
+        def test_download_then_dpkg(self):
+            p = AptProgress(now=0)
+            self.assertFalse(p.feed("Reading package lists...\n"))
+            self.assertTrue(p.feed("dlstatus:1:50.0:Retrieving file 1 of 2\n"))
+            self.assertEqual(p.phase, "download")
+            self.assertAlmostEqual(p.fraction, 0.15)
+            p.feed("pmstatus:linux-image-6.14.0-37-generic:50.0:Configuring linux-image-6.14.0-37-generic\n")
+            self.assertEqual(p.phase, "configure")
+            self.assertAlmostEqual(p.fraction, 0.65)
+            self.assertAlmostEqual(p.eta(now=65), 35)
+            p.feed("pmstatus:dpkg-exec:90.0:Running post-installation trigger initramfs-tools\n")
+            self.assertEqual(p.phase, "triggers")
+
+        def test_no_download_and_errors(self):
+            p = AptProgress(now=0)
+            p.feed("pmstatus:linux-image-6.8.0-40-generic:25.0:Removing linux-image-6.8.0-40-generic\n")
+            self.assertEqual((p.phase, p.fraction), ("remove", 0.25))
+            self.assertIsNone(p.eta(now=1))
+            p.feed("pmerror:/var/cache/apt/archives/x.deb:30.0:trying to overwrite '/usr/bin/x'\n")
+            self.assertEqual(len(p.errors), 1)
+
+    class TestHelperEvents(unittest.TestCase):
+
+        def test_parse(self):
+            ev = parse_helper_event('{"event":"step-end","ts":1,"step":"install","rc":0,"duration_ms":1200}\n')
+            self.assertEqual((ev["step"], ev["duration_ms"]), ("install", 1200))
+            self.assertIsNone(parse_helper_event("Error executing command as another user: Not authorized\n"))
+            self.assertIsNone(parse_helper_event("{not json\n"))
+            self.assertIsNone(parse_helper_event('{"no_event": 1}\n'))
+
+    class TestOperationQueue(unittest.TestCase):
+
+        def test_adjacent_compatible_jobs_merge(self):
+            q = OperationQueue()
+            self.assertFalse(q.add(QueuedJob("install", ["a", "b"])))
+            self.assertTrue(q.add(QueuedJob("install", ["b", "c"], hold=["c"], session="install-hold")))
+            self.assertFalse(q.add(QueuedJob("hold", ["x"])))
+            self.assertTrue(q.add(QueuedJob("hold", ["y"])))
+            self.assertEqual([(j.kind, j.pkgs) for j in q.jobs],
+                             [("install", ["a", "b", "c"]), ("hold", ["x", "y"])])
+            self.assertEqual(q.jobs[0].hold, ["c"])
+            self.assertEqual(q.jobs[0].label(), "Install + Hold 3")
+
+        def test_order_and_kinds_are_kept(self):
+            q = OperationQueue()
+            q.add(QueuedJob("remove", ["a"]))
+            q.add(QueuedJob("remove", ["b"], purge=True))
+            q.add(QueuedJob("install", ["c"]))
+            q.add(QueuedJob("remove", ["d"]))
+            self.assertEqual([j.label() for j in q.jobs], ["Remove 1", "Purge 1", "Install 1", "Remove 1"])
+            self.assertEqual(q.pop().pkgs, ["a"])
+
+    class TestDpkgLock(unittest.TestCase):
+
+        def test_holder_found_through_proc_locks(self):
+            import fcntl
+            import tempfile
+            with tempfile.NamedTemporaryFile() as locked, tempfile.NamedTemporaryFile() as free:
+                self.assertIsNone(dpkg_lock_holder([locked.name, free.name]))
+                fcntl.lockf(locked, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                holder = dpkg_lock_holder([free.name, locked.name])
+                self.assertEqual((holder["pid"], holder["lock"]), (os.getpid(), locked.name))
+                self.assertGreaterEqual(holder["running_secs"], 0)
+                fcntl.lockf(locked, fcntl.LOCK_UN)
+                self.assertIsNone(dpkg_lock_holder([locked.name]))
+
+        def test_missing_lock_files(self):
+            self.assertIsNone(dpkg_lock_holder(["/nonexistent/lock"]))
+
+    class TestHelperSession(unittest.TestCase):
+        """xkm-helper's session loop, run directly (no pkexec) with fake
+        tools first on PATH."""
+
+        def setUp(self):
+            if not (shutil.which("bash") and os.path.isfile(HELPER_PATH)):
+                self.skipTest("needs bash and xkm-helper")
+            self.bin = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, self.bin)
+
+        def tool(self, name, body):
+            path = os.path.join(self.bin, name)
+            with open(path, "w") as f:
+                f.write("#!/bin/sh\n" + body + "\n")
+            os.chmod(path, 0o755)
+
+        def session(self, *requests):
+            """{request id: rc} for each request line sent to one session."""
+            env = dict(os.environ, PATH=self.bin + os.pathsep + os.environ.get("PATH", ""))
+            lines = "".join(f"{i} {r}\n" for i, r in enumerate(requests, 1))
+            proc = subprocess.run(["bash", HELPER_PATH, "session", "10"], input=lines,
+                                  capture_output=True, text=True, env=env, timeout=60)
+            return {int(i): int(rc) for i, rc in
+                    re.findall(r"\x1exkm-request-done (\d+) (\d+)", proc.stdout)}
+
+        def test_failing_command_fails_the_request(self):
+            # dkms-autoinstall's status parsing isn't wrapped in run(), so
+            # only errexit stops it when awk fails.
+            self.tool("dkms", 'echo "nvidia/550, 6.14.0-37-generic, x86_64: installed"')
+            self.tool("awk", "exit 1")
+            rcs = self.session("dkms-autoinstall 6.14.0-37-generic", "dkms-autoinstall")
+            self.assertNotEqual(rcs[1], 0)
+            # ...and the session carries on with the next request.
+            self.assertNotEqual(rcs[2], 0)
+
+    class TestSearchIndex(unittest.TestCase):
+
+        def setUp(self):
+            self.rows = [
+                _row("linux-image-6.14.0-37-generic"),
+                _row("linux-headers-6.14.0-37-generic"),
+                _row("linux-image-6.11.0-1027-oem"),
+                _row("linux-image-6.18.3-x64v3-xanmod1"),
+                _row("linux-image-liquorix-amd64"),
+            ]
+            self.facets = FacetIndex(self.rows)
+            self.search = SearchIndex(self.facets)
+
+        def names(self, query):
+            return [r.name for r in self.facets.rows_in(self.search.search(query))]
+
+        def test_matches_plain_substring_scan(self):
+            for q in ("", "6", "li", "image", "6.14", "-37-", "xanmod", "AMD64", "zzz"):
+                expected = [r.name for r in self.rows if q.lower() in r.name.lower()
+                            or q.lower() in r.kver]
+                self.assertEqual(self.names(q), expected, q)
+
+        def test_narrowing_refines_previous_result(self):
+            self.assertEqual(len(self.names("linux-image")), 4)
+            self.assertEqual(self.names("linux-image-6.1"), [
+                "linux-image-6.14.0-37-generic", "linux-image-6.11.0-1027-oem",
+                "linux-image-6.18.3-x64v3-xanmod1",
+            ])
+            self.assertEqual(self.names("linux-image-6.14"), ["linux-image-6.14.0-37-generic"])
+            # ...and widening again (backspace) still gives the right answer.
+            self.assertEqual(len(self.names("linux-image")), 4)
+
+        def test_empty_inventory(self):
+            self.assertEqual(SearchIndex(FacetIndex([])).search("6.14"), 0)
+
+    class TestFilterQuery(unittest.TestCase):
+
+        def setUp(self):
+            self.rows = [
+                _row("linux-image-6.14.0-37-generic", installed=True, active=True),
+                _row("linux-image-6.8.0-45-generic", installed=True, held=True),
+                _row("linux-image-6.4.0-10-generic", installed=True),
+                _row("linux-image-6.4.0-10-lowlatency"),
+                _row("linux-image-6.18.3-x64v3-xanmod1", version="6.18.3-x64v3-xanmod1"),
+                _row("linux-headers-6.14.0-37-generic"),
+            ]
+            facets = FacetIndex(self.rows)
+            self.facets = facets
+            self.query = FilterQuery(facets, SearchIndex(facets),
+                                     lambda a, b: KernelManager._version_cmp(None, a, b))
+
+        def names(self, text):
+            return [r.name for r in self.facets.rows_in(self.query.evaluate(text))]
+
+        def test_installed_not_held_older_than(self):
+            self.assertEqual(self.names("status:installed held:no kver<6.5"),
+                             ["linux-image-6.4.0-10-generic"])
+
+        def test_version_range_uses_debian_ordering(self):
+            # 6.14 > 6.8 numerically, even though "6.14" < "6.8" as strings.
+            self.assertEqual(self.names("family:mainline kver>=6.8 category:image"), [
+                "linux-image-6.14.0-37-generic", "linux-image-6.8.0-45-generic",
+            ])
+
+        def test_kver_series(self):
+            self.assertEqual(self.names("kver:6.4"), [
+                "linux-image-6.4.0-10-generic", "linux-image-6.4.0-10-lowlatency",
+            ])
+
+        def test_flavor_and_psabi(self):
+            self.assertEqual(self.names("flavor:low-latency"), ["linux-image-6.4.0-10-lowlatency"])
+            self.assertEqual(self.names("flavor:v3"), self.names("psabi:x64v3"))
+            self.assertEqual(self.names("flavor:lowlatency,v3"), [
+                "linux-image-6.4.0-10-lowlatency", "linux-image-6.18.3-x64v3-xanmod1",
+            ])
+
+        def test_mixed_with_plain_words(self):
+            self.assertEqual(self.names("headers status:available"), ["linux-headers-6.14.0-37-generic"])
+
+        def test_status_held(self):
+            self.assertEqual(self.names("status:held"), ["linux-image-6.8.0-45-generic"])
+
+        def test_malformed_terms_raise(self):
+            for text in ("bogus:1", "held:maybe", "flavor>=generic"):
+                with self.assertRaises(ValueError):
+                    self.query.evaluate(text)
+
+        def test_malformed_term_dropped_rest_kept(self):
+            mask, errors = self.query.evaluate_valid("held:maybe status:held")
+            self.assertEqual(len(errors), 1)
+            self.assertEqual(mask, self.query.evaluate("status:held"))
+            # Still raises through evaluate(), cached or not.
+            with self.assertRaises(ValueError):
+                self.query.evaluate("held:maybe status:held")
+
     suite = unittest.TestLoader().loadTestsFromTestCase(TestClassification)
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestVersionCompare))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestFacetIndex))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestSelectionModel))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestGroupAggregates))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestMainlineWindow))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestNvidiaModuleMatrix))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestLogRetention))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestLogIndex))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestAptProgress))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestHelperEvents))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestOperationQueue))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestDpkgLock))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestHelperSession))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestSearchIndex))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestFilterQuery))
     runner = unittest.TextTestRunner(verbosity=2)
     result = runner.run(suite)
     sys.exit(0 if result.wasSuccessful() else 1)